@@ -0,0 +1,352 @@
+"""
+Vectorised at-risk analytics over classroom / district student records.
+
+Records are held column-wise (one NumPy array per metric). A :class:`RuleSet`
+turns each :class:`Rule` into a boolean mask over all students at once, and
+:class:`CohortAnalytics` keeps per-group running sums (per class and per
+cohort) so :meth:`CohortAnalytics.upsert` only re-evaluates and re-aggregates
+the students whose rows actually changed.
+
+Typical use::
+
+    ca = CohortAnalytics()
+    for chunk in io.read_students("district.csv"):
+        ca.upsert(chunk)
+    ca.summary("class_id")
+
+A nightly job keeps the per-student state between runs with
+:meth:`CohortAnalytics.save` / :meth:`CohortAnalytics.load`, so each run
+only recomputes the students whose rows changed since the last one::
+
+    ca = CohortAnalytics.load("state.npz") if os.path.exists("state.npz") else CohortAnalytics()
+    for chunk in io.read_students("district.csv", cache_dir=".cache"):
+        ca.upsert(chunk)
+    ca.save("state.npz")
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import io
+from .models.store import Interner
+
+PathLike = str | os.PathLike
+
+METRICS: Tuple[str, ...] = ("avg_score", "attendance_rate", "last_activity_days_ago")
+GROUPINGS: Tuple[str, ...] = ("class_id", "cohort")
+
+_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Flags a student when ``column <op> threshold`` holds."""
+    name: str
+    column: str
+    op: str
+    threshold: float
+
+    def __post_init__(self) -> None:
+        if self.op not in _OPS:
+            raise ValueError(f"unknown op {self.op!r}; expected one of {sorted(_OPS)}")
+
+    def mask(self, values: np.ndarray) -> np.ndarray:
+        return _OPS[self.op](values, self.threshold)
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    A student is at risk when ``any`` (default) or ``all`` rules fire.
+
+    Missing or unparsable metric values are read as ``missing_value`` before
+    the rules run, matching the demo script's ``_to_float`` default of 0.
+    """
+    rules: Tuple[Rule, ...]
+    mode: str = "any"
+    missing_value: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.mode not in ("any", "all"):
+            raise ValueError("mode must be 'any' or 'all'")
+
+    @property
+    def names(self) -> List[str]:
+        return [r.name for r in self.rules]
+
+    def evaluate(self, columns: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(flags, at_risk)``: an ``n x rules`` mask and its any/all reduction."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        flags = np.zeros((n, len(self.rules)), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            values = np.nan_to_num(np.asarray(columns[rule.column], dtype=np.float64), nan=self.missing_value)
+            flags[:, j] = rule.mask(values)
+        reduce = np.any if self.mode == "any" else np.all
+        at_risk = reduce(flags, axis=1) if self.rules else np.zeros(n, dtype=bool)
+        return flags, at_risk
+
+
+DEFAULT_RULES = RuleSet(
+    (
+        Rule("low_score", "avg_score", "<", 60),
+        Rule("low_attendance", "attendance_rate", "<", 0.8),
+        Rule("inactive", "last_activity_days_ago", ">", 14),
+    )
+)
+
+
+@dataclass
+class _GroupSums:
+    """Running per-group totals for one grouping column."""
+    names: Interner = field(default_factory=Interner)
+    students: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    at_risk: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    rule_hits: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.int64))
+    sums: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+
+    def reserve(self, n_groups: int, n_rules: int) -> None:
+        have = len(self.students)
+        if n_groups <= have and self.rule_hits.shape[1] == n_rules:
+            return
+        size = max(n_groups, 2 * have, 8)
+        self.students = np.resize(self.students, size); self.students[have:] = 0
+        self.at_risk = np.resize(self.at_risk, size); self.at_risk[have:] = 0
+        hits = np.zeros((size, n_rules), dtype=np.int64)
+        hits[:have, : self.rule_hits.shape[1]] = self.rule_hits
+        self.rule_hits = hits
+        sums = np.zeros((size, len(METRICS)))
+        sums[:have] = self.sums[:have] if len(self.sums) else 0.0
+        self.sums = sums
+
+    def add(self, groups: np.ndarray, sign: int, values: np.ndarray, flags: np.ndarray, at_risk: np.ndarray) -> None:
+        np.add.at(self.students, groups, sign)
+        np.add.at(self.at_risk, groups, sign * at_risk.astype(np.int64))
+        np.add.at(self.rule_hits, groups, sign * flags.astype(np.int64))
+        np.add.at(self.sums, groups, sign * values)
+
+
+class CohortAnalytics:
+    """
+    Incremental at-risk state for a population of students.
+
+    Per-student metrics, flags and group membership are stored in arrays
+    indexed by interned ``student_id``; per-group aggregates are running sums,
+    so reports cost O(groups) and updates cost O(changed students).
+    """
+
+    def __init__(self, rules: RuleSet = DEFAULT_RULES) -> None:
+        unknown = sorted({r.column for r in rules.rules} - set(METRICS))
+        if unknown:
+            raise ValueError(f"rules reference columns {unknown} that are not stored; expected one of {METRICS}")
+        self.rules = rules
+        self.students = Interner()
+        self._names: List[str] = []
+        self._values = np.zeros((0, len(METRICS)))
+        self._present = np.zeros(0, dtype=bool)
+        self._flags = np.zeros((0, len(rules.rules)), dtype=bool)
+        self._at_risk = np.zeros(0, dtype=bool)
+        self._group_idx: Dict[str, np.ndarray] = {g: np.zeros(0, dtype=np.int64) for g in GROUPINGS}
+        self._groups: Dict[str, _GroupSums] = {g: _GroupSums() for g in GROUPINGS}
+        self._totals = _GroupSums()
+
+    @classmethod
+    def from_csv(cls, path: PathLike, rules: RuleSet = DEFAULT_RULES, chunk_size: int = io.DEFAULT_CHUNK_SIZE) -> "CohortAnalytics":
+        ca = cls(rules)
+        for chunk in io.read_students(path, chunk_size):
+            ca.upsert(chunk)
+        return ca
+
+    def __len__(self) -> int:
+        return int(self._present.sum())
+
+    def save(self, path: PathLike) -> None:
+        """
+        Write the per-student arrays and the rule set to one ``.npz`` file.
+
+        Group totals are not stored; :meth:`load` rebuilds them from the
+        per-student rows.
+        """
+        n = len(self.students)
+        arrays = {
+            "student_ids": np.asarray(list(self.students), dtype=str),
+            "names": np.asarray(self._names[:n], dtype=str),
+            "values": self._values[:n],
+            "present": self._present[:n],
+            "flags": self._flags[:n],
+            "at_risk": self._at_risk[:n],
+            "rules": np.asarray(json.dumps(_rules_dict(self.rules))),
+        }
+        for g in GROUPINGS:
+            arrays[f"{g}.names"] = np.asarray(list(self._groups[g].names), dtype=str)
+            arrays[f"{g}.idx"] = self._group_idx[g][:n]
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: PathLike, rules: Optional[RuleSet] = None) -> "CohortAnalytics":
+        """
+        Restore state written by :meth:`save`.
+
+        ``rules`` defaults to the saved rule set. Flags are re-evaluated for
+        every student only when a different rule set is passed.
+        """
+        with np.load(path, allow_pickle=False) as z:
+            saved = _rules_from_dict(json.loads(str(z["rules"])))
+            ca = cls(saved if rules is None else rules)
+            ids = z["student_ids"].tolist()
+            n = len(ids)
+            ca.students.intern_many(ids)
+            ca._reserve(n)
+            ca._names[:n] = z["names"].tolist()
+            ca._values[:n] = z["values"]
+            ca._present[:n] = z["present"]
+            for g in GROUPINGS:
+                ca._groups[g].names.intern_many(z[f"{g}.names"].tolist())
+                ca._group_idx[g][:n] = z[f"{g}.idx"]
+            if ca.rules == saved:
+                ca._flags[:n], ca._at_risk[:n] = z["flags"], z["at_risk"]
+            elif n:
+                ca._flags[:n], ca._at_risk[:n] = ca.rules.evaluate({m: ca._values[:n, j] for j, m in enumerate(METRICS)})
+        for g in GROUPINGS:
+            ca._groups[g].reserve(len(ca._groups[g].names), len(ca.rules.rules))
+        ca._totals.reserve(1, len(ca.rules.rules))
+        rows = np.flatnonzero(ca._present[:n])
+        if len(rows):
+            ca._contribute(rows, +1)
+        return ca
+
+    def _reserve(self, n: int) -> None:
+        have = len(self._present)
+        if n <= have:
+            return
+        size = max(n, 2 * have, 64)
+        self._values = np.concatenate([self._values, np.zeros((size - have, len(METRICS)))])
+        self._present = np.concatenate([self._present, np.zeros(size - have, dtype=bool)])
+        self._flags = np.concatenate([self._flags, np.zeros((size - have, self._flags.shape[1]), dtype=bool)])
+        self._at_risk = np.concatenate([self._at_risk, np.zeros(size - have, dtype=bool)])
+        for g in GROUPINGS:
+            self._group_idx[g] = np.concatenate([self._group_idx[g], np.zeros(size - have, dtype=np.int64)])
+        self._names.extend([""] * (size - have))
+
+    def _contribute(self, rows: np.ndarray, sign: int) -> None:
+        values = np.nan_to_num(self._values[rows], nan=self.rules.missing_value)
+        flags, at_risk = self._flags[rows], self._at_risk[rows]
+        self._totals.add(np.zeros(len(rows), dtype=np.int64), sign, values, flags, at_risk)
+        for g in GROUPINGS:
+            self._groups[g].add(self._group_idx[g][rows], sign, values, flags, at_risk)
+
+    def upsert(self, chunk: Mapping[str, Any]) -> int:
+        """
+        Insert or update students from a column chunk (see ``io.read_students``).
+
+        Rows identical to the stored ones are skipped; for duplicate IDs the
+        last row wins. Returns the number of students added or changed.
+        """
+        ids = np.asarray(chunk["student_id"], dtype=str)
+        n = len(ids)
+        if not n:
+            return 0
+        idx = self.students.intern_many(ids)
+        # Keep only the last occurrence of each student in this chunk.
+        _, last_rev = np.unique(idx[::-1], return_index=True)
+        keep = np.sort(n - 1 - last_rev)
+        idx = idx[keep]
+        self._reserve(len(self.students))
+
+        values = np.column_stack([np.asarray(chunk.get(m, np.full(n, np.nan)), dtype=np.float64)[keep] for m in METRICS])
+        names = np.asarray(chunk.get("student_name", ids), dtype=str)[keep]
+        group_idx = {}
+        for g in GROUPINGS:
+            labels = np.asarray(chunk.get(g, np.full(n, "")), dtype=str)[keep]
+            group_idx[g] = self._groups[g].names.intern_many(labels)
+
+        changed = ~self._present[idx]
+        changed |= ~np.all((self._values[idx] == values) | (np.isnan(self._values[idx]) & np.isnan(values)), axis=1)
+        for g in GROUPINGS:
+            changed |= self._group_idx[g][idx] != group_idx[g]
+        old_names = [self._names[i] for i in idx.tolist()]
+        changed |= np.asarray([a != b for a, b in zip(old_names, names.tolist())], dtype=bool)
+        if not changed.any():
+            return 0
+
+        rows = idx[changed]
+        existing = rows[self._present[rows]]
+        if len(existing):
+            self._contribute(existing, -1)
+
+        self._values[rows] = values[changed]
+        for i, name in zip(rows.tolist(), names[changed].tolist()):
+            self._names[i] = name
+        for g in GROUPINGS:
+            self._group_idx[g][rows] = group_idx[g][changed]
+        self._present[rows] = True
+        flags, at_risk = self.rules.evaluate({m: self._values[rows, j] for j, m in enumerate(METRICS)})
+        self._flags[rows], self._at_risk[rows] = flags, at_risk
+
+        n_groups = {g: len(self._groups[g].names) for g in GROUPINGS}
+        for g in GROUPINGS:
+            self._groups[g].reserve(n_groups[g], len(self.rules.rules))
+        self._totals.reserve(1, len(self.rules.rules))
+        self._contribute(rows, +1)
+        return int(len(rows))
+
+    def remove(self, student_ids: Iterable[str]) -> int:
+        """Drop students from every aggregate; returns how many were present."""
+        idx = np.asarray([i for i in map(self.students.get, student_ids) if i is not None], dtype=np.int64)
+        rows = np.unique(idx[self._present[idx]]) if len(idx) else idx
+        if len(rows):
+            self._contribute(rows, -1)
+            self._present[rows] = False
+        return int(len(rows))
+
+    def at_risk(self) -> List[Tuple[str, str]]:
+        """``(student_id, student_name)`` of flagged students, in first-seen order."""
+        rows = np.flatnonzero(self._at_risk[: len(self.students)] & self._present[: len(self.students)])
+        return [(self.students[i], self._names[i]) for i in rows.tolist()]
+
+    def _report(self, sums: _GroupSums, i: int) -> Dict[str, Any]:
+        n = int(sums.students[i]) if len(sums.students) else 0
+        out: Dict[str, Any] = {"students": n, "at_risk": int(sums.at_risk[i]) if n else 0}
+        for j, m in enumerate(METRICS):
+            out[f"mean_{m}"] = float(sums.sums[i, j] / n) if n else 0.0
+        out["rule_hits"] = {r: int(sums.rule_hits[i, j]) if n else 0 for j, r in enumerate(self.rules.names)}
+        return out
+
+    def totals(self) -> Dict[str, Any]:
+        return self._report(self._totals, 0)
+
+    def summary(self, by: str = "class_id") -> Dict[str, Dict[str, Any]]:
+        """Aggregates per group of ``by`` (``class_id`` or ``cohort``); empty groups are omitted."""
+        if by not in self._groups:
+            raise ValueError(f"by must be one of {GROUPINGS}")
+        sums = self._groups[by]
+        return {
+            name: self._report(sums, i)
+            for i, name in enumerate(sums.names)
+            if i < len(sums.students) and sums.students[i] > 0
+        }
+
+
+def _rules_dict(rules: RuleSet) -> Dict[str, Any]:
+    return {"rules": [asdict(r) for r in rules.rules], "mode": rules.mode, "missing_value": rules.missing_value}
+
+
+def _rules_from_dict(d: Mapping[str, Any]) -> RuleSet:
+    return RuleSet(tuple(Rule(**r) for r in d["rules"]), d["mode"], d["missing_value"])
+
+
+def flag_at_risk(columns: Mapping[str, Sequence[Any]], rules: RuleSet = DEFAULT_RULES) -> np.ndarray:
+    """One-shot vectorised at-risk mask over already loaded columns."""
+    return rules.evaluate({r.column: np.asarray(columns[r.column], dtype=np.float64) for r in rules.rules})[1]
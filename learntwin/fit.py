@@ -0,0 +1,220 @@
+"""
+Per-skill BKT parameter fitting.
+
+Parameters are chosen by a vectorised grid search: for every skill the
+standard BKT forward recurrence (slip/guess emission, learn transition) is
+run over all students' sequences at once for a block of grid points, and the
+point with the highest log-likelihood wins. Skills are independent, so they
+are spread across a process pool.
+
+The result is a table of :class:`SkillFit` rows; :func:`params_table` turns
+it into the ``skill_params`` mapping that :class:`BKTModel` loads, and
+:func:`write_fits` / :func:`read_params` persist it as CSV.
+
+.. note::
+   The fitted model and :class:`BKTModel` do not agree yet. ``BKTModel``
+   still runs the placeholder update: add ``p_learn`` on a correct answer
+   and subtract ``0.5 * p_learn`` on a wrong one, clipped to [0, 1]. It
+   never reads ``p_slip`` or ``p_guess``. Loading a fitted table
+   therefore reuses ``p_init`` as the starting mastery and ``p_learn`` as
+   an additive step size, and drops the fitted slip and guess. The table
+   is exact for any consumer that runs standard BKT itself, and it becomes
+   exact for ``BKTModel`` once that model switches to the posterior and
+   transition update (see the xfail cases in ``tests/test_bkt_math.py``).
+"""
+from __future__ import annotations
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import product
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models.models_bkt import BKTParams
+from .utils import to_epoch_seconds
+
+PathLike = str | os.PathLike
+
+# Grid points evaluated together are capped so that (points x sequences)
+# float64 buffers stay around this many cells.
+_BLOCK_CELLS = 1 << 21
+_EPS = 1e-12
+
+
+@dataclass
+class SkillFit:
+    """Best parameters for one skill, with what it cost to find them."""
+    skill_id: str
+    params: BKTParams
+    log_likelihood: float
+    n_events: int
+    n_sequences: int
+    seconds: float
+
+
+def default_grid() -> np.ndarray:
+    """Grid of ``(p_init, p_learn, p_slip, p_guess)`` rows; slip/guess kept below 0.5."""
+    p_init = np.round(np.arange(0.05, 1.0, 0.1), 2)
+    p_learn = np.round(np.arange(0.05, 0.55, 0.05), 2)
+    p_slip = np.round(np.arange(0.05, 0.35, 0.05), 2)
+    p_guess = np.round(np.arange(0.05, 0.35, 0.05), 2)
+    return np.array(list(product(p_init, p_learn, p_slip, p_guess)), dtype=np.float64)
+
+
+def log_likelihood(correct: np.ndarray, starts: np.ndarray, lengths: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Log-likelihood of every grid row over a set of observation sequences.
+
+    ``correct`` holds the events of all sequences back to back; sequence
+    ``j`` is ``correct[starts[j]:starts[j] + lengths[j]]``. ``lengths`` must be
+    sorted in descending order so the sequences still running at step ``r``
+    are a prefix.
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    n_seq = len(starts)
+    out = np.zeros(len(grid))
+    if n_seq == 0:
+        return out
+    obs = np.asarray(correct, dtype=bool)
+    neg_lengths = -lengths
+    block = max(1, _BLOCK_CELLS // n_seq)
+    for lo in range(0, len(grid), block):
+        g = grid[lo:lo + block]
+        init, learn, slip, guess = (g[:, i:i + 1] for i in range(4))
+        L = np.repeat(init, n_seq, axis=1)
+        ll = np.zeros(len(g))
+        for r in range(int(lengths[0])):
+            a = int(np.searchsorted(neg_lengths, -r, side="left"))
+            o = obs[starts[:a] + r]
+            La = L[:, :a]
+            p_right = np.clip(La * (1.0 - slip) + (1.0 - La) * guess, _EPS, 1.0 - _EPS)
+            ll += np.where(o, np.log(p_right), np.log1p(-p_right)).sum(axis=1)
+            post = np.where(o, La * (1.0 - slip) / p_right, La * slip / (1.0 - p_right))
+            L[:, :a] = post + (1.0 - post) * learn
+        out[lo:lo + block] = ll
+    return out
+
+
+def _fit_one(task: Tuple[str, np.ndarray, np.ndarray, np.ndarray, np.ndarray]) -> SkillFit:
+    skill_id, correct, starts, lengths, grid = task
+    t0 = time.perf_counter()
+    ll = log_likelihood(correct, starts, lengths, grid)
+    best = int(np.argmax(ll))  # first maximum, so results do not depend on scheduling
+    p_init, p_learn, p_slip, p_guess = (float(v) for v in grid[best])
+    return SkillFit(
+        skill_id=skill_id,
+        params=BKTParams(p_init=p_init, p_learn=p_learn, p_slip=p_slip, p_guess=p_guess),
+        log_likelihood=float(ll[best]),
+        n_events=int(len(correct)),
+        n_sequences=int(len(starts)),
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def _skill_tasks(
+    user_ids: Iterable[str],
+    skill_ids: Iterable[str],
+    correct: Iterable[Any],
+    ts: Optional[Iterable[Any]],
+    grid: np.ndarray,
+) -> List[Tuple[str, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    users = np.asarray(user_ids, dtype=str)
+    skills = np.asarray(skill_ids, dtype=str)
+    obs = np.asarray(correct).astype(bool)
+    if not (len(users) == len(skills) == len(obs)):
+        raise ValueError("user_ids, skill_ids and correct must have the same length")
+    _, u = np.unique(users, return_inverse=True)
+    skill_names, s = np.unique(skills, return_inverse=True)
+    keys: List[np.ndarray] = [u, s]
+    if ts is not None:
+        keys.insert(0, to_epoch_seconds(ts))
+    order = np.lexsort(keys)  # by skill, then user, then ts; stable for ties
+    s, u, obs = s[order], u[order], obs[order]
+
+    tasks = []
+    bounds = np.flatnonzero(np.r_[True, s[1:] != s[:-1], True])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        su = u[lo:hi]
+        starts = np.flatnonzero(np.r_[True, su[1:] != su[:-1]])
+        lengths = np.diff(np.r_[starts, hi - lo])
+        by_len = np.argsort(-lengths, kind="stable")
+        tasks.append((str(skill_names[s[lo]]), obs[lo:hi], starts[by_len], lengths[by_len], grid))
+    return tasks
+
+
+def fit_skills(
+    user_ids: Iterable[str],
+    skill_ids: Iterable[str],
+    correct: Iterable[Any],
+    ts: Optional[Iterable[Any]] = None,
+    grid: Optional[np.ndarray] = None,
+    processes: Optional[int] = None,
+) -> Dict[str, SkillFit]:
+    """
+    Fit BKT parameters per skill from a column-oriented interaction log.
+
+    Each (user, skill) sequence is ordered by ``ts`` (input order when None).
+    ``processes=None`` uses one worker per CPU; ``processes=1`` fits inline.
+    Results are identical whatever the worker count.
+    """
+    grid = default_grid() if grid is None else np.asarray(grid, dtype=np.float64)
+    tasks = _skill_tasks(user_ids, skill_ids, correct, ts, grid)
+    # Largest skills first so a long tail of small ones fills the pool.
+    tasks.sort(key=lambda t: -len(t[1]))
+    workers = min(processes or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        fits = [_fit_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fits = list(pool.map(_fit_one, tasks))
+    return {f.skill_id: f for f in sorted(fits, key=lambda f: f.skill_id)}
+
+
+def params_table(fits: Mapping[str, SkillFit]) -> Dict[str, BKTParams]:
+    """
+    ``skill_id -> BKTParams`` mapping for ``BKTModel(skill_params=...)``.
+
+    ``BKTModel`` only uses ``p_init`` and ``p_learn`` from it, and not in
+    the way they were fitted; see the module note.
+    """
+    return {k: f.params for k, f in fits.items()}
+
+
+_PARAM_FIELDS: Tuple[str, ...] = ("p_init", "p_learn", "p_slip", "p_guess")
+_REPORT_FIELDS: Tuple[str, ...] = ("log_likelihood", "n_events", "n_sequences", "seconds")
+
+
+def write_fits(path: PathLike, fits: Mapping[str, SkillFit]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(("skill_id",) + _PARAM_FIELDS + _REPORT_FIELDS)
+        for fit in fits.values():
+            p = asdict(fit.params)
+            w.writerow([fit.skill_id] + [p[k] for k in _PARAM_FIELDS] + [getattr(fit, k) for k in _REPORT_FIELDS])
+
+
+def read_params(path: PathLike) -> Dict[str, BKTParams]:
+    """Read a table written by :func:`write_fits` (extra columns are ignored)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return {
+            row["skill_id"]: BKTParams(**{k: float(row[k]) for k in _PARAM_FIELDS})
+            for row in csv.DictReader(f)
+        }
+
+
+def format_report(fits: Mapping[str, SkillFit], wall_seconds: Optional[float] = None) -> str:
+    """Plain-text per-skill timing and log-likelihood summary."""
+    rows: Sequence[SkillFit] = list(fits.values())
+    lines = [f"{'skill_id':<16} {'events':>9} {'seqs':>7} {'loglik':>12} {'sec':>8}"]
+    for f in rows:
+        lines.append(f"{f.skill_id:<16} {f.n_events:>9} {f.n_sequences:>7} {f.log_likelihood:>12.2f} {f.seconds:>8.3f}")
+    cpu = sum(f.seconds for f in rows)
+    events = sum(f.n_events for f in rows)
+    lines.append(f"{len(rows)} skills, {events} events, {cpu:.3f} s fitting")
+    if wall_seconds is not None:
+        lines.append(f"wall time {wall_seconds:.3f} s")
+    return "\n".join(lines)
@@ -0,0 +1,257 @@
+"""
+Opt-in call counts, latency histograms and profiling for learntwin hot paths.
+
+Nothing is measured until :func:`enable` is called. It replaces the methods
+listed in :data:`TARGETS` with timing wrappers that feed one
+:class:`~learntwin.serving.histogram.LatencyHistogram` per operation.
+:func:`disable` puts the original functions back. While disabled the library
+therefore runs its original, unwrapped code, with no flag checks on any
+call path.
+
+Typical use::
+
+    from learntwin import instrument
+
+    with instrument.instrumented() as metrics:
+        io.ingest_interactions(model, "interactions.csv")
+        rec.next_items("u1", candidates)
+    print(metrics.to_prometheus())
+
+    with instrument.profile(memory=True) as report:
+        model.update_batch(users, skills, correct)
+    print(report.text())
+
+Subclasses that override an instrumented method are not measured.
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import io as _io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import analytics, io, recommender
+from .models.models_bkt import BKTModel
+from .recsys import recommender as recsys_recommender
+from .serving.histogram import LatencyHistogram
+
+# Library calls run from microseconds (get_mastery) to seconds (ingestion).
+BOUNDS_MS: Sequence[float] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 10000.0,
+)
+
+# (owner, attribute, operation name, kind); "iter" times each item of a returned iterator.
+TARGETS: Tuple[Tuple[Any, str, str, str], ...] = (
+    (BKTModel, "get_mastery", "bkt.get_mastery", "call"),
+    (BKTModel, "get_mastery_many", "bkt.get_mastery_many", "call"),
+    (BKTModel, "mastery_block", "bkt.mastery_block", "call"),
+    (BKTModel, "update", "bkt.update", "call"),
+    (BKTModel, "update_batch", "bkt.update_batch", "call"),
+    (recommender.Recommender, "next_items", "recommender.candidates.next_items", "call"),
+    (recommender.Recommender, "skill_scores", "recommender.candidates.score", "call"),
+    (recommender, "top_k_by_skill", "recommender.candidates.sort", "call"),
+    (recommender.Recommender, "next_items_batch", "recommender.candidates.next_items_batch", "call"),
+    (recsys_recommender.Recommender, "next_items", "recommender.catalog.next_items", "call"),
+    (recsys_recommender.Recommender, "group_by_score", "recommender.catalog.score", "call"),
+    (recsys_recommender.Recommender, "merge_buckets", "recommender.catalog.sort", "static"),
+    (recsys_recommender.Recommender, "next_items_batch", "recommender.catalog.next_items_batch", "call"),
+    (io, "read_interactions", "ingest.parse_chunk", "iter"),
+    (io, "ingest_interactions", "ingest.interactions", "call"),
+    (analytics.CohortAnalytics, "upsert", "ingest.students_upsert", "call"),
+)
+
+
+class Metrics:
+    """Per-operation latency histograms; the histogram count is the call count."""
+
+    def __init__(self, bounds_ms: Sequence[float] = BOUNDS_MS) -> None:
+        self.bounds_ms = bounds_ms
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram(self.bounds_ms)
+        return hist
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.histogram(name).observe(seconds)
+
+    def reset(self) -> None:
+        for name in list(self.histograms):
+            self.histograms[name] = LatencyHistogram(self.bounds_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """``{operation: LatencyHistogram.snapshot()}`` for operations called at least once."""
+        return {name: h.snapshot() for name, h in sorted(self.histograms.items()) if h.count}
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        snap = self.snapshot()
+        for h in snap.values():
+            # The open-ended bucket bound is infinite, which JSON cannot hold.
+            h["buckets"][-1]["le_ms"] = "+Inf"
+        return json.dumps(snap, indent=indent)
+
+    def to_prometheus(self, prefix: str = "learntwin") -> str:
+        """Prometheus text exposition: one ``histogram`` family labelled by ``op``, in seconds."""
+        family = f"{prefix}_call_duration_seconds"
+        lines = [
+            f"# HELP {family} Latency of instrumented learntwin calls.",
+            f"# TYPE {family} histogram",
+        ]
+        for name, h in sorted(self.histograms.items()):
+            if not h.count:
+                continue
+            seen = 0
+            for bound, count in zip(list(h.bounds_ms) + [float("inf")], h.counts):
+                seen += count
+                le = "+Inf" if bound == float("inf") else repr(bound / 1000.0)
+                lines.append(f'{family}_bucket{{op="{name}",le="{le}"}} {seen}')
+            lines.append(f'{family}_sum{{op="{name}"}} {h.sum_ms / 1000.0!r}')
+            lines.append(f'{family}_count{{op="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+_originals: List[Tuple[Any, str, Any]] = []
+
+
+def _timed_call(fn: Callable[..., Any], hist: LatencyHistogram) -> Callable[..., Any]:
+    perf, observe = time.perf_counter, hist.observe
+
+    @functools.wraps(fn)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        t0 = perf()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            observe(perf() - t0)
+
+    return timed
+
+
+def _timed_iter(fn: Callable[..., Any], hist: LatencyHistogram) -> Callable[..., Any]:
+    perf, observe = time.perf_counter, hist.observe
+
+    @functools.wraps(fn)
+    def timed(*args: Any, **kwargs: Any) -> Iterator[Any]:
+        it = iter(fn(*args, **kwargs))
+        while True:
+            t0 = perf()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            observe(perf() - t0)
+            yield item
+
+    return timed
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def enable(metrics: Optional[Metrics] = None) -> Metrics:
+    """Start recording into ``metrics`` (default :data:`METRICS`); re-enabling switches the target."""
+    global METRICS
+    disable()
+    if metrics is not None:
+        METRICS = metrics
+    for owner, attr, name, kind in TARGETS:
+        raw = owner.__dict__[attr]
+        fn = raw.__func__ if isinstance(raw, staticmethod) else raw
+        wrapped = (_timed_iter if kind == "iter" else _timed_call)(fn, METRICS.histogram(name))
+        setattr(owner, attr, staticmethod(wrapped) if kind == "static" else wrapped)
+        _originals.append((owner, attr, raw))
+    return METRICS
+
+
+def disable() -> None:
+    """Restore the original functions; recorded metrics are kept."""
+    while _originals:
+        owner, attr, raw = _originals.pop()
+        setattr(owner, attr, raw)
+
+
+@contextmanager
+def instrumented(metrics: Optional[Metrics] = None) -> Iterator[Metrics]:
+    """
+    Enable instrumentation for the duration of a block.
+
+    On exit the previous :data:`METRICS` target and enabled state are
+    restored, so blocks nest.
+    """
+    global METRICS
+    previous, was_enabled = METRICS, enabled()
+    m = enable(metrics)
+    try:
+        yield m
+    finally:
+        disable()
+        METRICS = previous
+        if was_enabled:
+            enable(previous)
+
+
+@dataclass
+class ProfileReport:
+    """Results of a :func:`profile` block; filled in when the block exits."""
+    seconds: float = 0.0
+    stats: Optional[pstats.Stats] = None
+    peak_bytes: Optional[int] = None
+    top_allocations: List[str] = field(default_factory=list)
+
+    def text(self, sort: str = "cumulative", limit: int = 25) -> str:
+        out = [f"wall time: {self.seconds * 1000.0:.3f} ms"]
+        if self.peak_bytes is not None:
+            out.append(f"peak traced memory: {self.peak_bytes / 1e6:.3f} MB")
+            out.extend(self.top_allocations)
+        if self.stats is not None:
+            buf = _io.StringIO()
+            self.stats.stream = buf
+            self.stats.sort_stats(sort).print_stats(limit)
+            out.append(buf.getvalue())
+        return "\n".join(out)
+
+
+@contextmanager
+def profile(cpu: bool = True, memory: bool = False, top: int = 10) -> Iterator[ProfileReport]:
+    """
+    Attach cProfile (``cpu``) and/or tracemalloc (``memory``) to a block.
+
+    The yielded :class:`ProfileReport` holds pstats, the peak traced memory
+    and the ``top`` allocation sites by line. A tracemalloc session that was
+    already running is left running.
+    """
+    report = ProfileReport()
+    prof = cProfile.Profile() if cpu else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    if prof is not None:
+        prof.enable()
+    try:
+        yield report
+    finally:
+        if prof is not None:
+            prof.disable()
+        report.seconds = time.perf_counter() - t0
+        if prof is not None:
+            report.stats = pstats.Stats(prof)
+        if memory:
+            report.peak_bytes = tracemalloc.get_traced_memory()[1]
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            report.top_allocations = [str(s) for s in stats[:top]]
+            if started_tracing:
+                tracemalloc.stop()
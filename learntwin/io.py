@@ -0,0 +1,239 @@
+"""
+Streaming, chunked loaders for the CSV exports in ``docs/data_schemas.md``.
+
+Files are read in fixed-size chunks of ``chunk_size`` rows. Each chunk is a
+dict of column name -> NumPy array, with types converted once per chunk:
+IDs become unicode arrays, ``correct`` becomes int8 and ``ts`` becomes
+float64 epoch seconds (NaN when missing). A UTF-8 BOM is ignored, and the
+header row is optional: files without one are read positionally. A value
+that cannot be converted (e.g. a blank ``correct``) raises ``ValueError``
+naming the file, the column and the chunk's data-row range (1-based,
+excluding the header and blank lines).
+
+Passing ``cache_dir`` stores the parsed chunks as ``.npy`` columns, keyed by
+the source file's size and mtime, so a re-run on the same export skips CSV
+parsing entirely.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .utils import to_epoch_seconds
+
+Chunk = Dict[str, np.ndarray]
+PathLike = str | os.PathLike
+
+USERS_COLUMNS: Tuple[str, ...] = ("user_id",)
+ITEMS_COLUMNS: Tuple[str, ...] = ("item_id", "skill_id")
+INTERACTIONS_COLUMNS: Tuple[str, ...] = ("user_id", "item_id", "skill_id", "correct", "ts")
+# Classroom roster export (see README "Sample data"); class_id and cohort are optional.
+STUDENTS_COLUMNS: Tuple[str, ...] = (
+    "student_id",
+    "student_name",
+    "avg_score",
+    "attendance_rate",
+    "last_activity_days_ago",
+    "class_id",
+    "cohort",
+)
+
+DEFAULT_CHUNK_SIZE = 65536
+CACHE_VERSION = 1
+
+
+def _ids(values: Sequence[str]) -> np.ndarray:
+    return np.asarray(values, dtype=str)
+
+
+def _correct(values: Sequence[str]) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64).astype(np.int8)
+
+
+def _floats(values: Sequence[str]) -> np.ndarray:
+    """Parse floats; blanks and unparsable values become NaN."""
+    try:
+        return np.asarray([v or "nan" for v in values], dtype=np.float64)
+    except ValueError:
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                pass
+        return out
+
+
+_CONVERTERS: Dict[str, Callable[[Sequence[str]], np.ndarray]] = {
+    "user_id": _ids,
+    "item_id": _ids,
+    "skill_id": _ids,
+    "correct": _correct,
+    "ts": to_epoch_seconds,
+    "student_id": _ids,
+    "student_name": _ids,
+    "avg_score": _floats,
+    "attendance_rate": _floats,
+    "last_activity_days_ago": _floats,
+    "class_id": _ids,
+    "cohort": _ids,
+}
+
+
+def _column_positions(first: List[str], columns: Sequence[str]) -> Tuple[List[Optional[int]], bool]:
+    """Map each schema column to a field index, and say whether ``first`` is a header."""
+    names = [f.strip().lower() for f in first]
+    if columns[0] in names:
+        return [names.index(c) if c in names else None for c in columns], True
+    return list(range(len(columns))), False
+
+
+def _parse_chunks(path: Path, columns: Sequence[str], chunk_size: int) -> Iterator[Chunk]:
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        rows = (r for r in csv.reader(f) if r)
+        first = next(rows, None)
+        if first is None:
+            return
+        positions, has_header = _column_positions(first, columns)
+        if not has_header:
+            rows = _chain_one(first, rows)
+        first_row = 1
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                return
+            chunk: Chunk = {}
+            for name, pos in zip(columns, positions):
+                raw = [r[pos] if pos is not None and pos < len(r) else "" for r in block]
+                try:
+                    chunk[name] = _CONVERTERS[name](raw)
+                except ValueError as exc:
+                    last_row = first_row + len(block) - 1
+                    raise ValueError(f"{path}: bad {name!r} value in data rows {first_row}-{last_row}: {exc}") from exc
+            first_row += len(block)
+            yield chunk
+
+
+def _chain_one(first: List[str], rest: Iterator[List[str]]) -> Iterator[List[str]]:
+    yield first
+    yield from rest
+
+
+def _cache_dir_for(path: Path, cache_dir: Path) -> Path:
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_dir / f"{path.name}.{digest}"
+
+
+def _fingerprint(path: Path, columns: Sequence[str], chunk_size: int) -> dict:
+    st = path.stat()
+    return {
+        "version": CACHE_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "columns": list(columns),
+        "chunk_size": chunk_size,
+    }
+
+
+def _read_cache(target: Path, fingerprint: dict) -> Optional[int]:
+    """Return the number of cached chunks if ``target`` matches ``fingerprint``."""
+    try:
+        manifest = json.loads((target / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if {k: manifest.get(k) for k in fingerprint} != fingerprint:
+        return None
+    return int(manifest["n_chunks"])
+
+
+def _cached_chunks(target: Path, columns: Sequence[str], n_chunks: int) -> Iterator[Chunk]:
+    for i in range(n_chunks):
+        yield {c: np.load(target / f"{i:06d}.{c}.npy") for c in columns}
+
+
+def _caching_chunks(
+    path: Path, columns: Sequence[str], chunk_size: int, target: Path, fingerprint: dict
+) -> Iterator[Chunk]:
+    tmp = target.with_name(target.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    n_chunks = n_rows = 0
+    try:
+        for chunk in _parse_chunks(path, columns, chunk_size):
+            for c in columns:
+                np.save(tmp / f"{n_chunks:06d}.{c}.npy", chunk[c], allow_pickle=False)
+            n_chunks += 1
+            n_rows += len(chunk[columns[0]])
+            yield chunk
+        manifest = dict(fingerprint, n_chunks=n_chunks, n_rows=n_rows, source=str(path))
+        (tmp / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    finally:
+        # Only a fully consumed file becomes a cache entry.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def iter_chunks(
+    path: PathLike,
+    columns: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache_dir: Optional[PathLike] = None,
+) -> Iterator[Chunk]:
+    """Stream ``path`` as columnar chunks of at most ``chunk_size`` rows."""
+    path = Path(path)
+    chunk_size = max(1, int(chunk_size))
+    if cache_dir is None:
+        yield from _parse_chunks(path, columns, chunk_size)
+        return
+    target = _cache_dir_for(path, Path(cache_dir))
+    fingerprint = _fingerprint(path, columns, chunk_size)
+    n_chunks = _read_cache(target, fingerprint)
+    if n_chunks is not None:
+        yield from _cached_chunks(target, columns, n_chunks)
+    else:
+        yield from _caching_chunks(path, columns, chunk_size, target, fingerprint)
+
+
+def read_users(path: PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE, cache_dir: Optional[PathLike] = None) -> Iterator[Chunk]:
+    return iter_chunks(path, USERS_COLUMNS, chunk_size, cache_dir)
+
+
+def read_items(path: PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE, cache_dir: Optional[PathLike] = None) -> Iterator[Chunk]:
+    return iter_chunks(path, ITEMS_COLUMNS, chunk_size, cache_dir)
+
+
+def read_interactions(path: PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE, cache_dir: Optional[PathLike] = None) -> Iterator[Chunk]:
+    return iter_chunks(path, INTERACTIONS_COLUMNS, chunk_size, cache_dir)
+
+
+def read_students(path: PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE, cache_dir: Optional[PathLike] = None) -> Iterator[Chunk]:
+    return iter_chunks(path, STUDENTS_COLUMNS, chunk_size, cache_dir)
+
+
+def ingest_interactions(
+    model,
+    path: PathLike,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache_dir: Optional[PathLike] = None,
+) -> int:
+    """
+    Feed an interactions export into ``model.update_batch`` chunk by chunk.
+
+    Memory stays bounded by ``chunk_size``. Events are ordered by ``ts``
+    within a chunk; chunks are applied in file order, so exports should be
+    chronological. Returns the number of rows ingested.
+    """
+    n = 0
+    for chunk in read_interactions(path, chunk_size, cache_dir):
+        model.update_batch(chunk["user_id"], chunk["skill_id"], chunk["correct"], chunk["ts"])
+        n += len(chunk["correct"])
+    return n
@@ -0,0 +1,225 @@
+"""
+Mastery change feed and a read-through cache driven by it.
+
+:class:`ChangeFeed` is a bounded ring buffer of mastery writes. Every record
+gets a sequence number, and subscribers tail the feed by asking for records
+from the last sequence they saw. Once more than ``capacity`` newer records
+have been written, the oldest are dropped. Reading from a dropped sequence
+raises :class:`FeedGap`, which tells the subscriber to resync from scratch.
+
+:class:`MasteryCache` keeps per-user mastery vectors in an LRU with an
+optional TTL. Before each read it drains the feed and evicts exactly the
+users that were written.
+
+Typical use::
+
+    model.enable_feed()
+    seq = model.feed.head
+    ...
+    for change in model.changes(seq):
+        seq = change.seq + 1
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CAPACITY = 65536
+
+
+class MasteryChange(NamedTuple):
+    user_id: str
+    skill_id: str
+    old: float
+    new: float
+    seq: int
+
+
+class FeedGap(ValueError):
+    """The requested sequence has already been overwritten in the ring."""
+
+
+class ChangeFeed:
+    """
+    Ring buffer of ``(user, skill, old, new)`` writes keyed by sequence number.
+
+    Users and skills are stored as interned row/column indices of the owning
+    model's store; :meth:`BKTModel.changes` resolves them to IDs. ``generation``
+    is bumped for state-wide changes that per-cell records cannot describe,
+    such as new per-skill defaults.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = int(capacity)
+        self._user = np.zeros(capacity, dtype=np.int64)
+        self._skill = np.zeros(capacity, dtype=np.int64)
+        self._old = np.zeros(capacity, dtype=np.float64)
+        self._new = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # sequence number of the next record
+        self.generation = 0
+
+    @property
+    def tail(self) -> int:
+        """Oldest sequence number still held."""
+        return max(0, self.head - self.capacity)
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def append(self, user: int, skill: int, old: float, new: float) -> int:
+        i = self.head % self.capacity
+        self._user[i], self._skill[i], self._old[i], self._new[i] = user, skill, old, new
+        self.head += 1
+        return self.head - 1
+
+    def extend(self, users: np.ndarray, skills: np.ndarray, old: np.ndarray, new: np.ndarray) -> int:
+        """Append aligned arrays in order; returns the sequence of the first record."""
+        first = self.head
+        n = len(users)
+        skip = max(0, n - self.capacity)  # records that would be overwritten within this call
+        pos = (first + np.arange(skip, n)) % self.capacity
+        self._user[pos], self._skill[pos] = users[skip:], skills[skip:]
+        self._old[pos], self._new[pos] = old[skip:], new[skip:]
+        self.head += n
+        return first
+
+    def read(self, since: int, limit: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        ``(seq, user, skill, old, new)`` arrays for records with ``seq >= since``.
+
+        Raises :class:`FeedGap` if ``since`` is older than :attr:`tail`.
+        """
+        if since < self.tail:
+            raise FeedGap(f"sequence {since} was dropped; feed now starts at {self.tail}")
+        since = min(since, self.head)
+        stop = self.head if limit is None else min(self.head, since + max(0, limit))
+        seq = np.arange(since, stop, dtype=np.int64)
+        pos = seq % self.capacity
+        return seq, self._user[pos], self._skill[pos], self._old[pos], self._new[pos]
+
+    def invalidate_all(self) -> None:
+        self.generation += 1
+
+
+class MasteryCache:
+    """
+    LRU (and optional TTL) read-through cache of per-user mastery vectors.
+
+    Vectors are aligned with ``model.skills`` and invalidated from the model's
+    change feed, so hits are never stale. Skills first seen after a vector
+    was cached are filled in from their column defaults. That is exact,
+    because any write to the cached user would have evicted the entry. If
+    the feed overflowed or its generation changed, everything is dropped.
+    For time-aware models the raw row and its timestamps are cached, and
+    decay is applied on every read.
+    """
+
+    def __init__(
+        self,
+        model,
+        maxsize: int = 10000,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.model = model
+        self.feed: ChangeFeed = model.feed or model.enable_feed()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, Optional[np.ndarray]]]" = OrderedDict()
+        self._seq = self.feed.head
+        self._generation = self.feed.generation
+        self.hits = self.misses = self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def sync(self) -> int:
+        """Evict users written since the last sync; returns how many were evicted."""
+        feed = self.feed
+        if feed.generation != self._generation:
+            n = len(self._entries)
+            self._entries.clear()
+            self._generation, self._seq = feed.generation, feed.head
+            self.invalidations += n
+            return n
+        if self._seq == feed.head:
+            return 0
+        try:
+            _, users, _, _, _ = feed.read(self._seq)
+        except FeedGap:
+            n = len(self._entries)
+            self._entries.clear()
+            self._seq = feed.head
+            self.invalidations += n
+            return n
+        self._seq = feed.head
+        n = 0
+        names = self.model.users
+        for u in np.unique(users).tolist():
+            if self._entries.pop(names[u], None) is not None:
+                n += 1
+        self.invalidations += n
+        return n
+
+    def _fetch(self, user_id: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        store = self.model._store
+        vec = np.array(store.user_row(user_id))
+        vec.flags.writeable = False
+        if not store.track_ts:
+            return vec, None
+        u = store.users.get(user_id)
+        ts = np.full(len(vec), np.nan) if u is None else np.array(store.timestamps()[u])
+        return vec, ts
+
+    def _serve(self, vec: np.ndarray, ts: Optional[np.ndarray], now: Optional[float]) -> np.ndarray:
+        if ts is None:
+            return vec
+        return self.model._decayed_view(vec, ts, np.arange(len(vec)), now)
+
+    def user_mastery(self, user_id: str, now: Optional[float] = None) -> np.ndarray:
+        """Read-only copy of ``model.user_mastery(user_id, now)``, served from cache when fresh."""
+        self.sync()
+        t = self._clock()
+        entry = self._entries.get(user_id)
+        if entry is not None and (self.ttl is None or t - entry[0] < self.ttl):
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            _, vec, ts = entry
+            n_skills = len(self.model.skills)
+            if len(vec) < n_skills:
+                vec = np.concatenate([vec, self.model._store.column_defaults()[len(vec):]])
+                vec.flags.writeable = False
+                if ts is not None:
+                    ts = np.concatenate([ts, np.full(n_skills - len(ts), np.nan)])
+                self._entries[user_id] = (entry[0], vec, ts)
+            return self._serve(vec, ts, now)
+        self.misses += 1
+        vec, ts = self._fetch(user_id)
+        self._entries[user_id] = (t, vec, ts)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return self._serve(vec, ts, now)
+
+    def get_mastery(self, user_id: str, skill_id: str, now: Optional[float] = None) -> float:
+        s = self.model.skills.get(skill_id)
+        if s is None:
+            return self.model.get_mastery(user_id, skill_id)
+        return float(self.user_mastery(user_id, now)[s])
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
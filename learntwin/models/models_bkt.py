@@ -1,7 +1,17 @@
 ﻿from __future__ import annotations
 
+import os
+import time
 from dataclasses import dataclass
-from typing import Optional, Dict, Tuple
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ..utils import to_epoch_seconds
+from . import snapshot
+from .feed import ChangeFeed, MasteryChange
+from .store import Interner, MasteryStore
 
 
 @dataclass
@@ -11,6 +21,8 @@ class BKTParams:
     p_learn: float = 0.15
     p_slip: float = 0.1
     p_guess: float = 0.2
+    # Forgetting half-life in seconds for time-aware models; None disables decay.
+    half_life: Optional[float] = None
 
 
 class BKTModel:
@@ -19,18 +31,326 @@ class BKTModel:
 
     This is not a full BKT implementation; it just stores a mastery value
     per (user, skill) and nudges it up/down based on correctness.
+
+    Mastery lives in a dense ``users x skills`` matrix (see
+    :class:`~learntwin.models.store.MasteryStore`); pass
+    ``dtype=np.float32`` to halve its footprint at the cost of precision.
+
+    ``params`` applies to every skill without an entry in ``skill_params``
+    (e.g. a table produced by :mod:`learntwin.fit`). Only ``p_init`` and
+    ``p_learn`` are read, and ``p_learn`` is used as the placeholder step
+    size, so a fitted table does not reproduce the standard BKT model it
+    was fitted under.
+
+    With ``feed_capacity`` (or after :meth:`enable_feed`) every write is also
+    recorded in :attr:`feed`, a :class:`~learntwin.models.feed.ChangeFeed`
+    that consumers can tail via :meth:`changes`. The feed is per process and
+    is not saved in snapshots.
+
+    With ``time_aware=True`` each cell also keeps its last-update time, and
+    reads decay mastery toward the skill's ``p_init`` with the skill's
+    ``half_life``: ``p_init + (m - p_init) * 2 ** (-(now - last) / half_life)``.
+    Decay is applied lazily at read time (``now`` defaults to ``clock()``) and
+    before each update, so stored state is only touched by writes.
     """
-    def __init__(self, params: Optional[BKTParams] = None, seed: int = 0) -> None:
+    def __init__(
+        self,
+        params: Optional[BKTParams] = None,
+        seed: int = 0,
+        dtype: np.dtype | type = np.float64,
+        skill_params: Optional[Mapping[str, BKTParams]] = None,
+        feed_capacity: Optional[int] = None,
+        time_aware: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
         self.params = params or BKTParams()
+        self.clock = clock
+        self.feed: Optional[ChangeFeed] = None
+        if feed_capacity:
+            self.enable_feed(feed_capacity)
         self.seed = seed
-        self._state: Dict[Tuple[str, str], float] = {}
+        self._store = MasteryStore(self.params.p_init, dtype=dtype, track_ts=time_aware)
+        self.skill_params: Dict[str, BKTParams] = {}
+        self._half_lives_cache: Optional[np.ndarray] = None
+        if skill_params:
+            self.set_skill_params(skill_params)
+        # (snapshot path, snapshot id, last delta seq) this state descends from.
+        self._checkpoint: Optional[Tuple[str, str, int]] = None
+
+    def save(self, path: str | os.PathLike) -> None:
+        """Write a full snapshot; see :mod:`learntwin.models.snapshot`."""
+        snapshot.save_snapshot(self, path)
+
+    def save_delta(self, path: str | os.PathLike) -> Path:
+        """Append the changes since the last save/load to the snapshot at ``path``."""
+        return snapshot.save_delta(self, path)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, mmap: bool = True) -> "BKTModel":
+        """Open a snapshot (memory-mapped by default) and replay its deltas."""
+        return snapshot.load_snapshot(cls, path, mmap=mmap)
+
+    def enable_feed(self, capacity: int = 65536) -> ChangeFeed:
+        """Start recording writes in a ring of ``capacity`` records (kept if already enabled)."""
+        if self.feed is None:
+            self.feed = ChangeFeed(capacity)
+        return self.feed
+
+    def changes(self, since: int = 0, limit: Optional[int] = None) -> List[MasteryChange]:
+        """
+        Records with ``seq >= since``, oldest first.
+
+        Raises :class:`~learntwin.models.feed.FeedGap` once ``since`` has been
+        overwritten; resume from ``changes[-1].seq + 1``.
+        """
+        if self.feed is None:
+            raise ValueError("change feed is not enabled; call enable_feed() first")
+        seq, u, s, old, new = self.feed.read(since, limit)
+        users, skills = self.users, self.skills
+        return [
+            MasteryChange(users[i], skills[j], o, n, q)
+            for i, j, o, n, q in zip(u.tolist(), s.tolist(), old.tolist(), new.tolist(), seq.tolist())
+        ]
+
+    def params_for(self, skill_id: str) -> BKTParams:
+        return self.skill_params.get(skill_id, self.params)
+
+    def set_skill_params(self, table: Mapping[str, BKTParams]) -> None:
+        """
+        Load per-skill parameters.
+
+        Must happen before a skill receives updates: its ``p_init`` becomes the
+        mastery of every user not yet updated on it. Raises ``ValueError`` for
+        skills that already have state.
+        """
+        for skill_id, p in table.items():
+            self._store.set_column_default(skill_id, p.p_init)
+            self.skill_params[skill_id] = p
+        self._half_lives_cache = None
+        if self.feed is not None and table:
+            self.feed.invalidate_all()
+
+    @property
+    def users(self) -> Interner:
+        """Known user IDs, in row order of :meth:`skill_mastery`."""
+        return self._store.users
+
+    @property
+    def skills(self) -> Interner:
+        """Known skill IDs, in column order of :meth:`user_mastery`."""
+        return self._store.skills
 
-    def get_mastery(self, user_id: str, skill_id: str) -> float:
-        return self._state.get((user_id, skill_id), self.params.p_init)
+    @property
+    def time_aware(self) -> bool:
+        return self._store.track_ts
 
-    def update(self, user_id: str, skill_id: str, is_correct: bool) -> float:
-        m = self.get_mastery(user_id, skill_id)
-        delta = self.params.p_learn * (1.0 if is_correct else -0.5)
+    def _half_lives(self) -> np.ndarray:
+        """Per-column half-life in seconds (inf: no decay), aligned with ``self.skills``."""
+        cache = self._half_lives_cache
+        n = len(self.skills)
+        if cache is None or len(cache) < n:
+            hl = [self.params_for(k).half_life for k in self.skills]
+            cache = np.array([np.inf if h is None else h for h in hl], dtype=np.float64)
+            self._half_lives_cache = cache
+        return cache[:n]
+
+    def _decay(self, values: np.ndarray, last: np.ndarray, cols: np.ndarray, now: Any) -> np.ndarray:
+        """Decay ``values`` last written at ``last`` to time ``now``; NaN times are left alone."""
+        dt = np.maximum(np.asarray(now, dtype=np.float64) - last, 0.0)
+        factor = np.exp2(-dt / self._half_lives()[cols])
+        base = self._store.column_defaults()[cols].astype(np.float64)
+        # Skip the arithmetic where nothing decays so those values stay bit-identical.
+        return np.where(np.isnan(factor) | (factor == 1.0), values, base + (values - base) * factor)
+
+    def get_mastery(self, user_id: str, skill_id: str, now: Optional[float] = None) -> float:
+        if not self.time_aware:
+            return self._store.get(user_id, skill_id)
+        store = self._store
+        idx = store.index(user_id, skill_id)
+        if idx is None:
+            return store.get(user_id, skill_id)
+        # Scalar form of _decay in plain floats; only exp2 goes through NumPy,
+        # so it runs the same kernel as the vector paths and update_batch.
+        u, s = idx
+        m = store.get_cell(u, s)
+        half_life = self.params_for(skill_id).half_life
+        if half_life is None:
+            return m
+        dt = (self.clock() if now is None else now) - store.ts_at(u, s)
+        if not dt > 0.0:  # also NaN: never stamped, or no read time
+            return m
+        factor = float(np.exp2(-dt / half_life))
+        if factor == 1.0:
+            return m
+        base = float(store.column_defaults()[s])
+        return base + (m - base) * factor
+
+    def get_mastery_many(
+        self, user_ids: Iterable[str], skill_ids: Iterable[str], now: Optional[float] = None
+    ) -> np.ndarray:
+        """:meth:`get_mastery` for aligned ID sequences, as one float64 array."""
+        if not self.time_aware:
+            return self._store.get_many(user_ids, skill_ids)
+        u, s = self._store.lookup_many(user_ids, skill_ids)
+        out = self._store.get_indexed(u, s)
+        known = np.flatnonzero((u >= 0) & (s >= 0))
+        if len(known):
+            ku, ks = u[known], s[known]
+            now = self.clock() if now is None else now
+            out[known] = self._decay(out[known], self._store.gather_ts(ku, ks), ks, now)
+        return out
+
+    def mastery_block(
+        self, user_ids: Iterable[str], skill_ids: Iterable[str], now: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        ``len(user_ids) x len(skill_ids)`` float64 block of :meth:`get_mastery`
+        values, gathered from the store in one pass.
+        """
+        out, u, s = self._store.block(user_ids, skill_ids)
+        if self.time_aware:
+            ku, ks = np.flatnonzero(u >= 0), np.flatnonzero(s >= 0)
+            if len(ku) and len(ks):
+                idx = np.ix_(ku, ks)
+                last = self._store.gather_ts(*np.ix_(u[ku], s[ks]))
+                out[idx] = self._decay(out[idx], last, s[ks], self.clock() if now is None else now)
+        return out
+
+    def _decayed_view(self, view: np.ndarray, ts: np.ndarray, cols: np.ndarray, now: Optional[float]) -> np.ndarray:
+        out = self._decay(view.astype(np.float64), ts, cols, self.clock() if now is None else now)
+        out = out.astype(view.dtype)
+        out.flags.writeable = False
+        return out
+
+    def user_mastery(self, user_id: str, now: Optional[float] = None) -> np.ndarray:
+        """Read-only view of one user's mastery across ``self.skills`` (a decayed copy if time-aware)."""
+        row = self._store.user_row(user_id)
+        u = self.users.get(user_id)
+        if not self.time_aware or u is None:
+            return row
+        cols = np.arange(len(self.skills))
+        return self._decayed_view(row, self._store.timestamps()[u], cols, now)
+
+    def skill_mastery(self, skill_id: str, now: Optional[float] = None) -> np.ndarray:
+        """Read-only view of every user's mastery on a skill, across ``self.users`` (decayed copy if time-aware)."""
+        col = self._store.skill_column(skill_id)
+        s = self.skills.get(skill_id)
+        if not self.time_aware or s is None:
+            return col
+        return self._decayed_view(col, self._store.timestamps()[:, s], np.full(len(col), s), now)
+
+    def mastery_matrix(self, now: Optional[float] = None) -> np.ndarray:
+        """Read-only view of the full ``users x skills`` mastery block (decayed copy if time-aware)."""
+        block = self._store.matrix()
+        if not self.time_aware:
+            return block
+        cols = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+        return self._decayed_view(block, self._store.timestamps(), cols, now)
+
+    def update(self, user_id: str, skill_id: str, is_correct: bool, ts: Optional[float] = None) -> float:
+        """
+        Apply one interaction. For time-aware models, mastery is first decayed
+        to ``ts`` (default ``clock()``), which then becomes the cell's
+        last-update time; ``ts`` is ignored otherwise.
+        """
+        if self.time_aware:
+            ts = self.clock() if ts is None else float(ts)
+            m = self.get_mastery(user_id, skill_id, now=ts)
+        else:
+            m = self.get_mastery(user_id, skill_id)
+        delta = self.params_for(skill_id).p_learn * (1.0 if is_correct else -0.5)
         new_m = max(0.0, min(1.0, m + delta))
-        self._state[(user_id, skill_id)] = new_m
+        self._store.set(user_id, skill_id, new_m, ts=ts)
+        if self.feed is not None:
+            u, s = self._store.index(user_id, skill_id)
+            self.feed.append(u, s, m, float(self._store.get(user_id, skill_id)))
         return new_m
+
+    def update_batch(
+        self,
+        user_ids: Iterable[str],
+        skill_ids: Iterable[str],
+        correct: Iterable[Any],
+        ts: Optional[Iterable[Any]] = None,
+    ) -> np.ndarray:
+        """
+        Apply a column-oriented interaction log in one call.
+
+        Events are grouped by (user, skill) and applied in ``ts`` order within
+        each pair; input order breaks ties and is used when ``ts`` is None.
+        Rows with a missing ``ts`` go after timestamped rows of the same pair.
+        The recurrence runs vectorised across pairs and leaves exactly the same
+        state as calling :meth:`update` row by row in that order.
+
+        For time-aware models, mastery decays between consecutive events of
+        a pair as in :meth:`update`. When ``ts`` is None every row is stamped
+        with one ``clock()`` reading. Rows with a missing ``ts`` neither decay
+        nor move the stamp.
+
+        Returns the post-update mastery of every row, in input order.
+
+        With the change feed enabled, rows are recorded in the order they were
+        applied: ``ts`` order, with input order breaking ties.
+        """
+        correct = np.asarray(correct).astype(bool).ravel()
+        n = len(correct)
+        # Validate before interning so a bad call leaves no new users or skills behind.
+        user_ids = user_ids if isinstance(user_ids, np.ndarray) else list(user_ids)
+        skill_ids = skill_ids if isinstance(skill_ids, np.ndarray) else list(skill_ids)
+        if len(user_ids) != n or len(skill_ids) != n:
+            raise ValueError("user_ids, skill_ids and correct must have the same length")
+        ts_key = None if ts is None else to_epoch_seconds(ts).ravel()
+        if ts_key is not None and len(ts_key) != n:
+            raise ValueError("ts must have the same length as correct")
+        out = np.empty(n, dtype=np.float64)
+        if n == 0:
+            return out
+        u, s = self._store.intern_many(user_ids, skill_ids)
+
+        key = u * len(self.skills) + s
+        if ts_key is None:
+            order = np.argsort(key, kind="stable")
+        else:
+            order = np.lexsort((ts_key, key))  # lexsort is stable
+        time_aware = self.time_aware
+        if time_aware:
+            event_ts = (np.full(n, float(self.clock())) if ts_key is None else ts_key)[order]
+        key = key[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        lengths = np.diff(np.r_[starts, n])
+        # Longest runs first, so the pairs still active at step r are a prefix.
+        by_len = np.argsort(-lengths, kind="stable")
+        starts, lengths = starts[by_len], lengths[by_len]
+
+        rows, cols = u[order[starts]], s[order[starts]]
+        m = self._store.gather(rows, cols).astype(np.float64)
+        if time_aware:
+            last = self._store.gather_ts(rows, cols)
+        p_learn = np.array([self.params_for(k).p_learn for k in self.skills])[s[order]]
+        delta = np.where(correct[order], p_learn * 1.0, p_learn * -0.5)
+        store_dtype = self._store.dtype
+        feed = self.feed
+        if feed is not None:
+            old = np.empty(n, dtype=np.float64)
+            stored = np.empty(n, dtype=np.float64)
+        neg_lengths = -lengths
+        for r in range(int(lengths[0])):
+            active = int(np.searchsorted(neg_lengths, -r, side="left"))
+            pos = starts[:active] + r
+            if time_aware:
+                t = event_ts[pos]
+                m[:active] = self._decay(m[:active], last[:active], cols[:active], t)
+                last[:active] = np.where(np.isnan(t), last[:active], t)
+            new_m = np.clip(m[:active] + delta[pos], 0.0, 1.0)
+            out[order[pos]] = new_m
+            if feed is not None:
+                old[order[pos]] = m[:active]
+            # Round through the store dtype like update() does between events.
+            m[:active] = new_m.astype(store_dtype)
+            if feed is not None:
+                stored[order[pos]] = m[:active]
+        self._store.scatter(rows, cols, m, ts=last if time_aware else None)
+        if feed is not None:
+            applied = np.arange(n) if ts_key is None else np.argsort(ts_key, kind="stable")
+            feed.extend(u[applied], s[applied], old[applied], stored[applied])
+        return out
@@ -0,0 +1,356 @@
+"""
+Multi-process BKT state partitioned by user.
+
+:class:`ShardedBKTModel` has the same ``get_mastery`` / ``update`` /
+``update_batch`` API as :class:`BKTModel`, but keeps state in ``n_shards``
+worker processes, each owning the users that hash to it. Users never span
+shards, so every (user, skill) sequence is updated by exactly one process
+and results match a single model exactly.
+
+Batch calls are split by shard and sent to all workers before any reply is
+awaited, so shards work in parallel. Cross-user reads such as
+:meth:`ShardedBKTModel.skill_mastery` fan out to every shard.
+
+The partition is ``crc32(user_id, seed) % n_shards``: stable across
+processes and runs (unlike ``hash()``), so a given seed and shard count
+always place a user on the same shard.
+
+With ``time_aware=True`` the workers keep update times and decay on read
+as in :class:`BKTModel`. ``clock`` runs in the parent process only: a
+missing ``now`` or ``ts`` is read from it once per call and sent to the
+shards, so every shard sees the same time.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import time
+import zlib
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models_bkt import BKTModel, BKTParams
+
+PathLike = str | os.PathLike
+
+# Methods a worker will run on its model.
+_ALLOWED = {
+    "get_mastery",
+    "get_mastery_many",
+    "mastery_block",
+    "update",
+    "update_batch",
+    "set_skill_params",
+    "_check_skill_params",
+    "save",
+    "save_delta",
+    "_user_mastery",
+    "_skill_mastery",
+    "_load",
+}
+
+
+class _ShardModel(BKTModel):
+    """Worker-side model with the fan-out helpers the facade needs."""
+
+    def _user_mastery(self, user_id: str, now: Optional[float]) -> Tuple[List[str], np.ndarray]:
+        return list(self.skills), np.array(self.user_mastery(user_id, now))
+
+    def _skill_mastery(self, skill_id: str, now: Optional[float]) -> Tuple[List[str], np.ndarray]:
+        return list(self.users), np.array(self.skill_mastery(skill_id, now))
+
+    def _check_skill_params(self, skill_ids: List[str]) -> None:
+        """Raise like :meth:`set_skill_params` would, without applying anything."""
+        written = self._store.columns_written()
+        for skill_id in skill_ids:
+            s = self.skills.get(skill_id)
+            if s is not None and written[s]:
+                raise ValueError(f"skill {skill_id!r} already has mastery state")
+
+    def _load(self, path: str) -> None:
+        loaded = _ShardModel.load(path)
+        self.__dict__.update(loaded.__dict__)
+
+
+def _worker(
+    conn: Connection,
+    params: BKTParams,
+    seed: int,
+    dtype: Any,
+    skill_params: Optional[Mapping[str, BKTParams]],
+    time_aware: bool,
+) -> None:
+    model = _ShardModel(params, seed=seed, dtype=dtype, skill_params=skill_params, time_aware=time_aware)
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        name, args = msg
+        try:
+            if name not in _ALLOWED:
+                raise AttributeError(f"shard does not serve {name!r}")
+            conn.send((True, getattr(model, name)(*args)))
+        except Exception as exc:
+            conn.send((False, exc))
+
+
+class ShardedBKTModel:
+    """
+    :class:`BKTModel` facade over ``n_shards`` worker processes.
+
+    Use as a context manager, or call :meth:`close`, to stop the workers.
+    """
+
+    def __init__(
+        self,
+        n_shards: int = 4,
+        params: Optional[BKTParams] = None,
+        seed: int = 0,
+        dtype: np.dtype | type = np.float64,
+        skill_params: Optional[Mapping[str, BKTParams]] = None,
+        mp_context: Optional[str] = None,
+        time_aware: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if n_shards < 1:
+            raise ValueError("n_shards must be >= 1")
+        self.n_shards = int(n_shards)
+        self.params = params or BKTParams()
+        self.seed = seed
+        self.time_aware = time_aware
+        self.clock = clock
+        ctx = mp.get_context(mp_context)
+        self._conns: List[Connection] = []
+        self._procs: List[Any] = []
+        for _ in range(self.n_shards):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child, self.params, seed, dtype, dict(skill_params or {}), time_aware),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    # -- partitioning -------------------------------------------------------
+
+    def shard_of(self, user_id: str) -> int:
+        return zlib.crc32(user_id.encode("utf-8"), self.seed & 0xFFFFFFFF) % self.n_shards
+
+    def _shards_of(self, user_ids: Sequence[str]) -> np.ndarray:
+        uniq, inv = np.unique(np.asarray(user_ids, dtype=str), return_inverse=True)
+        per_user = np.fromiter((self.shard_of(u) for u in uniq.tolist()), dtype=np.int64, count=len(uniq))
+        return per_user[inv.ravel()]
+
+    # -- transport ----------------------------------------------------------
+
+    def _call(self, shard: int, name: str, *args: Any) -> Any:
+        self._conns[shard].send((name, args))
+        return self._recv(shard)
+
+    def _recv(self, shard: int) -> Any:
+        ok, result = self._conns[shard].recv()
+        if not ok:
+            raise result
+        return result
+
+    def _broadcast(self, calls: Mapping[int, Tuple[str, Tuple[Any, ...]]]) -> Dict[int, Any]:
+        """Send every call first, then collect replies, so shards run concurrently."""
+        for shard, (name, args) in calls.items():
+            self._conns[shard].send((name, args))
+        results: Dict[int, Any] = {}
+        error: Optional[BaseException] = None
+        for shard in calls:
+            try:
+                results[shard] = self._recv(shard)
+            except Exception as exc:  # drain every reply before raising
+                error = error or exc
+        if error is not None:
+            raise error
+        return results
+
+    # -- BKTModel API -------------------------------------------------------
+
+    def _now(self, now: Optional[float]) -> Optional[float]:
+        """Resolve a missing read/update time here, so all shards use one clock reading."""
+        return self.clock() if now is None and self.time_aware else now
+
+    def get_mastery(self, user_id: str, skill_id: str, now: Optional[float] = None) -> float:
+        return self._call(self.shard_of(user_id), "get_mastery", user_id, skill_id, self._now(now))
+
+    def update(self, user_id: str, skill_id: str, is_correct: bool, ts: Optional[float] = None) -> float:
+        return self._call(self.shard_of(user_id), "update", user_id, skill_id, is_correct, self._now(ts))
+
+    def _split(self, user_ids: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Input row indices per shard, in input order."""
+        shards = self._shards_of(user_ids)
+        return {s: np.flatnonzero(shards == s) for s in np.unique(shards).tolist()}
+
+    def get_mastery_many(
+        self, user_ids: Iterable[str], skill_ids: Iterable[str], now: Optional[float] = None
+    ) -> np.ndarray:
+        users = np.asarray(list(user_ids), dtype=str)
+        skills = np.asarray(list(skill_ids), dtype=str)
+        if len(skills) != len(users):
+            raise ValueError("user_ids and skill_ids must have the same length")
+        out = np.empty(len(users), dtype=np.float64)
+        if not len(users):
+            return out
+        rows = self._split(users)
+        now = self._now(now)
+        results = self._broadcast({s: ("get_mastery_many", (users[r], skills[r], now)) for s, r in rows.items()})
+        for s, r in rows.items():
+            out[r] = results[s]
+        return out
+
+    def mastery_block(
+        self, user_ids: Iterable[str], skill_ids: Iterable[str], now: Optional[float] = None
+    ) -> np.ndarray:
+        """Users x skills block; each shard fills the rows of its own users."""
+        users = np.asarray(list(user_ids), dtype=str)
+        skills = list(skill_ids)
+        out = np.empty((len(users), len(skills)), dtype=np.float64)
+        if not len(users):
+            return out
+        rows = self._split(users)
+        now = self._now(now)
+        results = self._broadcast({s: ("mastery_block", (users[r].tolist(), skills, now)) for s, r in rows.items()})
+        for s, r in rows.items():
+            out[r] = results[s]
+        return out
+
+    def update_batch(
+        self,
+        user_ids: Iterable[str],
+        skill_ids: Iterable[str],
+        correct: Iterable[Any],
+        ts: Optional[Iterable[Any]] = None,
+    ) -> np.ndarray:
+        """Split a column log by shard and apply the parts in parallel; see :meth:`BKTModel.update_batch`."""
+        users = np.asarray(list(user_ids), dtype=str)
+        skills = np.asarray(list(skill_ids), dtype=str)
+        correct = np.asarray(list(correct))
+        ts_arr = None if ts is None else np.asarray(list(ts))
+        if not (len(users) == len(skills) == len(correct)):
+            raise ValueError("user_ids, skill_ids and correct must have the same length")
+        if ts_arr is not None and len(ts_arr) != len(users):
+            raise ValueError("ts must have the same length as correct")
+        out = np.empty(len(users), dtype=np.float64)
+        if not len(users):
+            return out
+        if ts_arr is None and self.time_aware:
+            ts_arr = np.full(len(users), float(self.clock()))
+        # flatnonzero keeps input order, so per-pair event order is preserved.
+        rows = self._split(users)
+        calls = {
+            s: ("update_batch", (users[r], skills[r], correct[r], None if ts_arr is None else ts_arr[r]))
+            for s, r in rows.items()
+        }
+        results = self._broadcast(calls)
+        for s, r in rows.items():
+            out[r] = results[s]
+        return out
+
+    def set_skill_params(self, table: Mapping[str, BKTParams]) -> None:
+        """
+        Load per-skill parameters on every shard, or on none.
+
+        All shards are checked first, so a skill with state on any shard
+        rejects the whole table and the shards keep the same defaults.
+        """
+        skill_ids = list(table)
+        self._broadcast({s: ("_check_skill_params", (skill_ids,)) for s in range(self.n_shards)})
+        self._broadcast({s: ("set_skill_params", (dict(table),)) for s in range(self.n_shards)})
+
+    def user_mastery(self, user_id: str, now: Optional[float] = None) -> Tuple[List[str], np.ndarray]:
+        """``(skill_ids, mastery)`` for one user, from its shard."""
+        return self._call(self.shard_of(user_id), "_user_mastery", user_id, self._now(now))
+
+    def skill_mastery(self, skill_id: str, now: Optional[float] = None) -> Tuple[List[str], np.ndarray]:
+        """``(user_ids, mastery)`` of every known user on a skill, gathered from all shards."""
+        now = self._now(now)
+        results = self._broadcast({s: ("_skill_mastery", (skill_id, now)) for s in range(self.n_shards)})
+        users: List[str] = []
+        for s in range(self.n_shards):
+            users.extend(results[s][0])
+        values = np.concatenate([results[s][1] for s in range(self.n_shards)])
+        return users, values
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: PathLike) -> None:
+        """Snapshot every shard to ``path/shard-NNN`` (see :meth:`BKTModel.save`)."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self._broadcast({s: ("save", (str(path / f"shard-{s:03d}"),)) for s in range(self.n_shards)})
+
+    def save_delta(self, path: PathLike) -> None:
+        path = Path(path)
+        self._broadcast({s: ("save_delta", (str(path / f"shard-{s:03d}"),)) for s in range(self.n_shards)})
+
+    @classmethod
+    def load(
+        cls,
+        path: PathLike,
+        seed: Optional[int] = None,
+        mp_context: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> "ShardedBKTModel":
+        """
+        Start one worker per ``shard-NNN`` snapshot under ``path``.
+
+        The partition seed and default params come from the shard manifests,
+        which must agree. Passing a ``seed`` that differs from the saved one
+        raises ``ValueError``, since users would be routed to the wrong shards.
+        """
+        shard_dirs = sorted(Path(path).glob("shard-[0-9][0-9][0-9]"))
+        if not shard_dirs:
+            raise ValueError(f"no shard snapshots under {path}")
+        metas = [json.loads((d / "manifest.json").read_text(encoding="utf-8")) for d in shard_dirs]
+        saved_seed, params = metas[0]["seed"], metas[0]["params"]
+        for d, meta in zip(shard_dirs, metas):
+            if meta["seed"] != saved_seed or meta["params"] != params:
+                raise ValueError(f"{d} was saved with a different seed or params than {shard_dirs[0]}")
+        if seed is not None and seed != saved_seed:
+            raise ValueError(f"seed {seed} does not match the saved partition seed {saved_seed}")
+        model = cls(
+            len(shard_dirs),
+            params=BKTParams(**params),
+            seed=saved_seed,
+            mp_context=mp_context,
+            time_aware=bool(metas[0].get("time_aware")),
+            clock=clock,
+        )
+        model._broadcast({s: ("_load", (str(d),)) for s, d in enumerate(shard_dirs)})
+        return model
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._procs = [], []
+
+    def __enter__(self) -> "ShardedBKTModel":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
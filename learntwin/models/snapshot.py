@@ -0,0 +1,208 @@
+"""
+On-disk snapshots of :class:`BKTModel` state.
+
+A snapshot is a directory of ``.npy`` files plus a JSON manifest::
+
+    manifest.json          format, version, snapshot id, params, shape
+    mastery.npy            users x skills matrix
+    users.npy              user IDs in row order
+    users.sorted.npy       the same IDs sorted, with users.order.npy mapping
+    users.order.npy          sorted position -> row
+    skills*.npy            as above, for columns
+    col_default.npy        per-skill initial mastery
+    col_written.npy        per-skill "has state" flags
+    last_ts.npy            users x skills last-update times (time-aware models only)
+    deltas/000001.npz ...  append-only changes since the base
+
+Loading memory-maps the matrix and ID tables (copy-on-write, so later
+updates never touch the files) and replays the deltas, so a new process can
+answer ``get_mastery`` without reading the whole snapshot. A delta stores the
+rows of users written since the previous checkpoint, the users and skills
+interned since, and the current parameters.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import numpy as np
+
+from .store import Interner, MasteryStore
+
+if TYPE_CHECKING:
+    from .models_bkt import BKTModel
+
+PathLike = str | os.PathLike
+
+FORMAT = "learntwin.bkt"
+VERSION = 1
+
+
+def _params_meta(model: "BKTModel") -> Dict[str, Any]:
+    return {
+        "seed": model.seed,
+        "params": asdict(model.params),
+        "skill_params": {k: asdict(p) for k, p in model.skill_params.items()},
+    }
+
+
+def _save_ids(dirpath: Path, name: str, ids: np.ndarray) -> None:
+    order = np.argsort(ids, kind="stable")
+    np.save(dirpath / f"{name}.npy", ids, allow_pickle=False)
+    np.save(dirpath / f"{name}.sorted.npy", ids[order], allow_pickle=False)
+    np.save(dirpath / f"{name}.order.npy", order.astype(np.int64), allow_pickle=False)
+
+
+def _load_ids(dirpath: Path, name: str, mmap: bool) -> Interner:
+    mode = "r" if mmap else None
+    return Interner.from_arrays(
+        np.load(dirpath / f"{name}.npy", mmap_mode=mode),
+        np.load(dirpath / f"{name}.sorted.npy", mmap_mode=mode),
+        np.load(dirpath / f"{name}.order.npy", mmap_mode=mode),
+    )
+
+
+def _read_manifest(path: Path) -> Dict[str, Any]:
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"{path} is not a BKT snapshot")
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"unsupported snapshot version {manifest.get('version')!r} (expected {VERSION})")
+    return manifest
+
+
+def save_snapshot(model: "BKTModel", path: PathLike) -> None:
+    """Write a full base snapshot of ``model`` to ``path``, replacing any old one."""
+    path = Path(path)
+    store = model._store
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    (tmp / "deltas").mkdir(parents=True)
+    snapshot_id = uuid.uuid4().hex
+    np.save(tmp / "mastery.npy", store.matrix(), allow_pickle=False)
+    _save_ids(tmp, "users", store.users.to_array())
+    _save_ids(tmp, "skills", store.skills.to_array())
+    np.save(tmp / "col_default.npy", store.column_defaults(), allow_pickle=False)
+    np.save(tmp / "col_written.npy", store.columns_written(), allow_pickle=False)
+    if store.track_ts:
+        np.save(tmp / "last_ts.npy", store.timestamps(), allow_pickle=False)
+    manifest = dict(
+        format=FORMAT,
+        version=VERSION,
+        snapshot_id=snapshot_id,
+        dtype=store.dtype.str,
+        shape=list(store.shape),
+        time_aware=store.track_ts,
+        **_params_meta(model),
+    )
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    store.mark_clean()
+    model._checkpoint = (str(path.resolve()), snapshot_id, 0)
+
+
+def save_delta(model: "BKTModel", path: PathLike) -> Path:
+    """
+    Append the changes since the last checkpoint to the snapshot at ``path``.
+
+    ``path`` must hold the base this model was saved to or loaded from, with
+    no deltas written by anyone else since. Returns the new delta's path.
+    """
+    path = Path(path)
+    checkpoint = model._checkpoint
+    manifest = _read_manifest(path)
+    if checkpoint is None or checkpoint[:2] != (str(path.resolve()), manifest["snapshot_id"]):
+        raise ValueError(f"model has no base snapshot at {path}; call save_snapshot first")
+    seq = checkpoint[2] + 1
+    target = path / "deltas" / f"{seq:06d}.npz"
+    if target.exists():
+        raise ValueError(f"delta {seq} already exists at {path}; the chain has diverged")
+
+    store = model._store
+    (old_users, old_skills), rows = store.changes()
+    n_users, n_skills = store.shape
+    meta = dict(snapshot_id=manifest["snapshot_id"], seq=seq, shape=[n_users, n_skills], **_params_meta(model))
+    tmp = target.with_name(f".{target.name}.tmp")
+    extra = {"ts_values": store.timestamps()[rows]} if store.track_ts else {}
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            **extra,
+            meta=np.array(json.dumps(meta)),
+            users=np.asarray([store.users[i] for i in range(old_users, n_users)], dtype=str),
+            skills=np.asarray([store.skills[i] for i in range(old_skills, n_skills)], dtype=str),
+            rows=rows.astype(np.int64),
+            values=store.matrix()[rows],
+            col_default=store.column_defaults(),
+            col_written=store.columns_written(),
+        )
+    os.replace(tmp, target)
+    store.mark_clean()
+    model._checkpoint = (checkpoint[0], checkpoint[1], seq)
+    return target
+
+
+def _apply_delta(store: MasteryStore, delta: Any) -> None:
+    store.restore(
+        delta["users"],
+        delta["skills"],
+        delta["rows"],
+        delta["values"],
+        delta["col_default"],
+        delta["col_written"],
+        delta["ts_values"] if "ts_values" in delta else None,
+    )
+
+
+def load_snapshot(model_cls: type, path: PathLike, mmap: bool = True) -> "BKTModel":
+    """
+    Open the snapshot at ``path`` and replay its deltas.
+
+    With ``mmap=True`` the matrix and ID tables are memory-mapped
+    copy-on-write; the matrix is only copied into memory when the model
+    first grows (a new user or skill arrives).
+    """
+    from .models_bkt import BKTParams
+
+    path = Path(path)
+    manifest = _read_manifest(path)
+    # An empty matrix cannot be mapped.
+    mmap_data = mmap and all(manifest["shape"])
+    data = np.load(path / "mastery.npy", mmap_mode="c" if mmap_data else None)
+    ts = None
+    if manifest.get("time_aware"):
+        ts = np.load(path / "last_ts.npy", mmap_mode="c" if mmap_data else None)
+    store = MasteryStore.from_arrays(
+        data,
+        _load_ids(path, "users", mmap),
+        _load_ids(path, "skills", mmap),
+        np.load(path / "col_default.npy"),
+        np.load(path / "col_written.npy"),
+        default=manifest["params"]["p_init"],
+        ts=ts,
+    )
+
+    meta = manifest
+    seq = 0
+    deltas: List[Path] = sorted((path / "deltas").glob("[0-9]*.npz"))
+    for i, delta_path in enumerate(deltas, start=1):
+        with np.load(delta_path, allow_pickle=False) as delta:
+            delta_meta = json.loads(str(delta["meta"]))
+            if delta_meta["snapshot_id"] != manifest["snapshot_id"] or delta_meta["seq"] != i:
+                raise ValueError(f"{delta_path} does not continue snapshot {manifest['snapshot_id']}")
+            _apply_delta(store, delta)
+        meta, seq = delta_meta, i
+    store.mark_clean()
+
+    model = model_cls(BKTParams(**meta["params"]), seed=meta["seed"], dtype=data.dtype)
+    model._store = store
+    model.skill_params = {k: BKTParams(**p) for k, p in meta["skill_params"].items()}
+    model._checkpoint = (str(path.resolve()), manifest["snapshot_id"], seq)
+    return model
+
@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class Interner:
+    """
+    Maps string IDs to dense integer indices in first-seen order.
+
+    Behaves like a read-only sequence of the interned IDs, so
+    ``interner[i]`` is the ID stored at row/column ``i``.
+
+    An interner restored from a snapshot keeps its base IDs in (possibly
+    memory-mapped) arrays and resolves them by binary search on first use,
+    so opening it does not rebuild a dict of every ID.
+    """
+
+    def __init__(self, ids: Iterable[str] = ()) -> None:
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._base: Optional[np.ndarray] = None
+        self._base_sorted: Optional[np.ndarray] = None
+        self._base_order: Optional[np.ndarray] = None
+        self._n_base = 0
+        for i in ids:
+            self.intern(i)
+
+    @classmethod
+    def from_arrays(cls, ids: np.ndarray, sorted_ids: np.ndarray, order: np.ndarray) -> "Interner":
+        """Wrap ``ids`` (index order) with ``sorted_ids = ids[order]`` as the base."""
+        it = cls()
+        it._base, it._base_sorted, it._base_order = ids, sorted_ids, order
+        it._n_base = len(ids)
+        return it
+
+    def to_array(self) -> np.ndarray:
+        """All IDs in index order as a unicode array."""
+        if self._base is None:
+            return np.asarray(self._ids, dtype=str)
+        if not self._ids:
+            return np.asarray(self._base)
+        return np.concatenate([np.asarray(self._base), np.asarray(self._ids, dtype=str)])
+
+    def __len__(self) -> int:
+        return self._n_base + len(self._ids)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._base is not None:
+            yield from self._base.tolist()
+        yield from self._ids
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if idx < self._n_base:
+            return str(self._base[idx])
+        return self._ids[idx - self._n_base]
+
+    def _lookup_base(self, key: str) -> Optional[int]:
+        pos = int(np.searchsorted(self._base_sorted, key))
+        if pos < self._n_base and self._base_sorted[pos] == key:
+            idx = int(self._base_order[pos])
+            self._index[key] = idx
+            return idx
+        return None
+
+    def get(self, key: str) -> Optional[int]:
+        idx = self._index.get(key)
+        if idx is None and self._n_base:
+            idx = self._lookup_base(key)
+        return idx
+
+    def intern(self, key: str) -> int:
+        idx = self.get(key)
+        if idx is None:
+            idx = len(self)
+            self._index[key] = idx
+            self._ids.append(key)
+        return idx
+
+    def intern_many(self, keys: Iterable[str]) -> np.ndarray:
+        """Intern every key and return their indices as an int64 array."""
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()  # plain str keys, not np.str_
+        intern = self.intern
+        return np.fromiter((intern(k) for k in keys), dtype=np.int64)
+
+
+class MasteryStore:
+    """
+    Dense users x skills mastery matrix with interned string IDs.
+
+    Rows are users and columns are skills. Capacity grows geometrically in
+    both directions, so interning a new user or skill is amortised O(1).
+    Cells that were never written hold their column's default, which is
+    ``default`` unless overridden with :meth:`set_column_default`.
+
+    Views returned by :meth:`user_row`, :meth:`skill_column` and
+    :meth:`matrix` share memory with the store and are read-only; they stay
+    valid until the store next grows.
+
+    With ``track_ts=True`` a parallel float64 matrix holds each cell's
+    last-update time (epoch seconds, NaN if never stamped); see
+    :meth:`timestamps`.
+    """
+
+    def __init__(
+        self,
+        default: float,
+        dtype: np.dtype | type = np.float64,
+        user_block: int = 256,
+        skill_block: int = 16,
+        track_ts: bool = False,
+    ) -> None:
+        # Round through dtype so unknown and never-written cells read the same.
+        self.default = float(np.dtype(dtype).type(default))
+        self.users = Interner()
+        self.skills = Interner()
+        self._user_block = max(1, int(user_block))
+        self._skill_block = max(1, int(skill_block))
+        self._data = np.full((0, 0), self.default, dtype=dtype)
+        # Per-skill initial value, and whether the column was ever written.
+        self._col_default = np.full(0, self.default, dtype=dtype)
+        self._col_written = np.zeros(0, dtype=bool)
+        self._ts: Optional[np.ndarray] = np.full((0, 0), np.nan) if track_ts else None
+        # Change tracking for incremental checkpoints: rows written and the
+        # shape at the last checkpoint (see mark_clean / changes).
+        self._dirty = np.zeros(0, dtype=bool)
+        self._clean_shape: Tuple[int, int] = (0, 0)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        data: np.ndarray,
+        users: Interner,
+        skills: Interner,
+        col_default: np.ndarray,
+        col_written: np.ndarray,
+        default: float,
+        ts: Optional[np.ndarray] = None,
+    ) -> "MasteryStore":
+        """
+        Adopt an existing ``users x skills`` matrix, e.g. a memory-mapped one.
+
+        ``data`` (and ``ts``, for a time-aware store) is used as-is until the
+        store first grows; the result starts clean as far as :meth:`changes`
+        is concerned.
+        """
+        store = cls(default, dtype=data.dtype, track_ts=ts is not None)
+        store.users, store.skills = users, skills
+        store._data = data
+        if ts is not None:
+            store._ts = ts
+        store._col_default = np.array(col_default, dtype=data.dtype)
+        store._col_written = np.array(col_written, dtype=bool)
+        store._dirty = np.zeros(data.shape[0], dtype=bool)
+        store.mark_clean()
+        return store
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    @property
+    def track_ts(self) -> bool:
+        return self._ts is not None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self.users), len(self.skills))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the backing matrices, including spare capacity."""
+        return int(self._data.nbytes) + (0 if self._ts is None else int(self._ts.nbytes))
+
+    def _reserve(self, n_users: int, n_skills: int) -> None:
+        rows, cols = self._data.shape
+        if n_users <= rows and n_skills <= cols:
+            return
+        new_rows = rows if n_users <= rows else max(n_users, 2 * rows, self._user_block)
+        new_cols = cols if n_skills <= cols else max(n_skills, 2 * cols, self._skill_block)
+        col_default = np.full(new_cols, self.default, dtype=self._data.dtype)
+        col_default[:cols] = self._col_default
+        col_written = np.zeros(new_cols, dtype=bool)
+        col_written[:cols] = self._col_written
+        grown = np.empty((new_rows, new_cols), dtype=self._data.dtype)
+        grown[:] = col_default
+        grown[:rows, :cols] = self._data
+        self._data = grown
+        if self._ts is not None:
+            ts = np.full((new_rows, new_cols), np.nan)
+            ts[:rows, :cols] = self._ts
+            self._ts = ts
+        self._col_default = col_default
+        self._col_written = col_written
+        dirty = np.zeros(new_rows, dtype=bool)
+        dirty[:rows] = self._dirty
+        self._dirty = dirty
+
+    def index(self, user_id: str, skill_id: str) -> Optional[Tuple[int, int]]:
+        """Return ``(row, col)`` for a known pair, or ``None``."""
+        u = self.users.get(user_id)
+        s = self.skills.get(skill_id)
+        if u is None or s is None:
+            return None
+        return u, s
+
+    def intern(self, user_id: str, skill_id: str) -> Tuple[int, int]:
+        """Return ``(row, col)`` for a pair, allocating storage if needed."""
+        u = self.users.intern(user_id)
+        s = self.skills.intern(skill_id)
+        self._reserve(u + 1, s + 1)
+        return u, s
+
+    def intern_many(
+        self, user_ids: Iterable[str], skill_ids: Iterable[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Vector form of :meth:`intern` for aligned ID columns."""
+        u = self.users.intern_many(user_ids)
+        s = self.skills.intern_many(skill_ids)
+        self._reserve(len(self.users), len(self.skills))
+        return u, s
+
+    def column_default(self, skill_id: str) -> float:
+        s = self.skills.get(skill_id)
+        return self.default if s is None else float(self._col_default[s])
+
+    def set_column_default(self, skill_id: str, value: float) -> None:
+        """
+        Set the initial value of one skill's never-written cells.
+
+        Raises ``ValueError`` once the skill has state, since written and
+        never-written cells can no longer be told apart.
+        """
+        s = self.skills.intern(skill_id)
+        self._reserve(len(self.users), s + 1)
+        if self._col_written[s]:
+            raise ValueError(f"skill {skill_id!r} already has mastery state")
+        self._col_default[s] = value
+        self._data[:, s] = self._col_default[s]
+
+    def get(self, user_id: str, skill_id: str) -> float:
+        s = self.skills.get(skill_id)
+        if s is None:
+            return self.default
+        u = self.users.get(user_id)
+        if u is None:
+            return float(self._col_default[s])
+        return float(self._data[u, s])
+
+    @staticmethod
+    def _lookup(interner: Interner, ids: Iterable[str]) -> np.ndarray:
+        """Indices of ``ids`` in ``interner``, -1 where unknown; nothing is interned."""
+        if isinstance(ids, np.ndarray):
+            ids = ids.tolist()  # plain str keys, not np.str_
+        get = interner.get
+        return np.fromiter((-1 if (i := get(k)) is None else i for k in ids), dtype=np.int64)
+
+    def lookup_many(self, user_ids: Iterable[str], skill_ids: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Row and column indices for aligned ID columns, -1 where unknown; nothing is interned."""
+        u = self._lookup(self.users, user_ids)
+        s = self._lookup(self.skills, skill_ids)
+        if len(u) != len(s):
+            raise ValueError("user_ids and skill_ids must have the same length")
+        return u, s
+
+    def get_many(self, user_ids: Iterable[str], skill_ids: Iterable[str]) -> np.ndarray:
+        """Vector form of :meth:`get`; nothing is interned."""
+        return self.get_indexed(*self.lookup_many(user_ids, skill_ids))
+
+    def get_indexed(self, u: np.ndarray, s: np.ndarray) -> np.ndarray:
+        """:meth:`get_many` for indices from :meth:`lookup_many`."""
+        known_skill = s >= 0
+        out = np.full(len(s), self.default, dtype=np.float64)
+        out[known_skill] = self._col_default[s[known_skill]]
+        known = known_skill & (u >= 0)
+        out[known] = self._data[u[known], s[known]]
+        return out
+
+    def block(self, user_ids: Iterable[str], skill_ids: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ``(values, u, s)``: a float64 ``len(user_ids) x len(skill_ids)`` block
+        as :meth:`get` would read it, plus the row/column indices (-1 where
+        unknown). Nothing is interned.
+        """
+        u = self._lookup(self.users, user_ids)
+        s = self._lookup(self.skills, skill_ids)
+        known_s = s >= 0
+        base = np.full(len(s), self.default, dtype=np.float64)
+        base[known_s] = self._col_default[s[known_s]]
+        out = np.empty((len(u), len(s)), dtype=np.float64)
+        out[:] = base
+        ku, ks = np.flatnonzero(u >= 0), np.flatnonzero(known_s)
+        if len(ku) and len(ks):
+            out[np.ix_(ku, ks)] = self._data[np.ix_(u[ku], s[ks])]
+        return out, u, s
+
+    def set(self, user_id: str, skill_id: str, value: float, ts: Optional[float] = None) -> None:
+        """Write one cell; ``ts`` stamps it in a time-aware store (NaN/None keeps the old stamp)."""
+        u, s = self.intern(user_id, skill_id)  # may reallocate self._data
+        self._data[u, s] = value
+        if ts is not None and self._ts is not None and ts == ts:
+            self._ts[u, s] = ts
+        self._col_written[s] = True
+        self._dirty[u] = True
+
+    def get_cell(self, u: int, s: int) -> float:
+        """Scalar :meth:`gather` for one interned ``(row, col)``."""
+        return float(self._data[u, s])
+
+    def ts_at(self, u: int, s: int) -> float:
+        """Last-update time of one interned cell (NaN if never stamped or not time-aware)."""
+        return float("nan") if self._ts is None else float(self._ts[u, s])
+
+    def gather(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Copy out the cells at aligned ``rows``/``cols`` index arrays."""
+        return self._data[rows, cols]
+
+    def gather_ts(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        Last-update times at ``rows``/``cols`` (all NaN if not time-aware).
+
+        The index arrays broadcast as in NumPy indexing, so ``np.ix_`` works.
+        """
+        if self._ts is None:
+            return np.full(np.broadcast(rows, cols).shape, np.nan)
+        return self._ts[rows, cols]
+
+    def scatter(
+        self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray, ts: Optional[np.ndarray] = None
+    ) -> None:
+        """Write ``values`` (and ``ts`` stamps, if tracked) into aligned, already interned ``rows``/``cols``."""
+        self._data[rows, cols] = values
+        if ts is not None and self._ts is not None:
+            self._ts[rows, cols] = ts
+        self._col_written[cols] = True
+        self._dirty[rows] = True
+
+    def column_defaults(self) -> np.ndarray:
+        return self._col_default[: len(self.skills)]
+
+    def columns_written(self) -> np.ndarray:
+        return self._col_written[: len(self.skills)]
+
+    def restore(
+        self,
+        users: Iterable[str],
+        skills: Iterable[str],
+        rows: np.ndarray,
+        values: np.ndarray,
+        col_default: np.ndarray,
+        col_written: np.ndarray,
+        ts_values: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Intern ``users``/``skills``, then overwrite whole rows and column
+        metadata, e.g. from a saved delta.
+        """
+        old_cols = len(self.skills)
+        self.intern_many(users, skills)
+        n_cols = len(col_default)
+        self._col_default[:n_cols] = col_default
+        self._col_written[:n_cols] = col_written
+        # Columns without state, or new since the rows were sized, hold defaults.
+        fill = np.flatnonzero(~self._col_written[:n_cols])
+        fill = np.union1d(fill, np.arange(old_cols, n_cols))
+        self._data[:, fill] = self._col_default[fill]
+        self._data[rows, : values.shape[1]] = values
+        if ts_values is not None and self._ts is not None:
+            self._ts[rows, : ts_values.shape[1]] = ts_values
+
+    def mark_clean(self) -> None:
+        """Start a new checkpoint interval."""
+        self._dirty[:] = False
+        self._clean_shape = self.shape
+
+    def changes(self) -> Tuple[Tuple[int, int], np.ndarray]:
+        """
+        ``(shape_at_last_checkpoint, dirty_rows)`` since :meth:`mark_clean`.
+
+        Rows are whole users written in the interval; users and skills
+        interned since are those past the old shape.
+        """
+        return self._clean_shape, np.flatnonzero(self._dirty[: len(self.users)])
+
+    def _readonly(self, view: np.ndarray) -> np.ndarray:
+        view.flags.writeable = False
+        return view
+
+    def matrix(self) -> np.ndarray:
+        """Read-only view of the populated ``users x skills`` block."""
+        n_users, n_skills = self.shape
+        return self._readonly(self._data[:n_users, :n_skills])
+
+    def timestamps(self) -> Optional[np.ndarray]:
+        """Read-only view of the populated last-update-time block, or None."""
+        if self._ts is None:
+            return None
+        n_users, n_skills = self.shape
+        return self._readonly(self._ts[:n_users, :n_skills])
+
+    def user_row(self, user_id: str) -> np.ndarray:
+        """Mastery of one user across all skills, aligned with ``skills``."""
+        u = self.users.get(user_id)
+        if u is None:
+            return self._readonly(self._col_default[: len(self.skills)].copy())
+        return self._readonly(self._data[u, : len(self.skills)])
+
+    def skill_column(self, skill_id: str) -> np.ndarray:
+        """Mastery of all users on one skill, aligned with ``users``."""
+        s = self.skills.get(skill_id)
+        if s is None:
+            return self._readonly(np.full(len(self.users), self.default, dtype=self.dtype))
+        return self._readonly(self._data[: len(self.users), s])
@@ -1,16 +1,51 @@
 from __future__ import annotations
+import heapq
+from functools import partial
 from dataclasses import dataclass
-from typing import List, Dict, Any, Iterable, Tuple
-from .models_bkt import BKT
+from typing import List, Dict, Any, Iterable, Sequence, Tuple
+import numpy as np
+from .models_bkt import BKTModel as BKT
+from .utils import top_columns
 
 def _key_det(item: Dict[str, Any]) -> Tuple[str, str]:
     # Deterministic tie-break: (skill_id, item_id) as strings
     return (str(item.get("skill_id", "")), str(item.get("item_id", "")))
 
+def group_by_skill(candidates: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Bucket candidates by skill_id, dropping malformed ones."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for c in candidates:
+        skill = str(c.get("skill_id", ""))
+        if not skill or "item_id" not in c:
+            # skip malformed candidates quietly
+            continue
+        groups.setdefault(skill, []).append(c)
+    return groups
+
+def top_k_by_skill(
+    groups: Dict[str, List[Dict[str, Any]]],
+    scores: Dict[str, float],
+    k: int,
+) -> List[Dict[str, Any]]:
+    """
+    Top-k candidates by score descending, then (skill_id, item_id) ascending.
+
+    Skills are ranked whole, and within a skill only the k smallest item keys
+    are selected with a bounded heap instead of sorting every candidate.
+    """
+    k = max(0, int(k))
+    out: List[Dict[str, Any]] = []
+    for skill in sorted(groups, key=lambda s: (-scores[s], s)):
+        if len(out) >= k:
+            break
+        out.extend(heapq.nsmallest(k - len(out), groups[skill], key=_key_det))
+    return out
+
 class Recommender:
     """
     Ranks items by (1 - mastery(skill_id)) descending.
     Lower mastery first, then deterministic tie-break on (skill_id, item_id).
+    Time-aware models rank on decayed mastery; pass ``now`` to pin the read time.
     """
     def __init__(self, bkt: BKT | None = None, seed: int = 0):
         self.seed = seed
@@ -20,23 +55,55 @@ class Recommender:
         self,
         user_id: str,
         candidates: Iterable[Dict[str, Any]],
-        k: int = 5
+        k: int = 5,
+        now: float | None = None,
     ) -> List[Dict[str, Any]]:
-        # Cache mastery per skill to avoid repeated lookups
-        mastery_cache: Dict[str, float] = {}
-        scored: List[Tuple[float, Tuple[str, str], Dict[str, Any]]] = []
-
-        for c in candidates:
-            skill = str(c.get("skill_id", ""))
-            if not skill or "item_id" not in c:
-                # skip malformed candidates quietly
-                continue
-            if skill not in mastery_cache:
-                mastery_cache[skill] = self.bkt.get_mastery(user_id, skill)
-            mastery = mastery_cache[skill]
-            score = 1.0 - mastery  # lower mastery → higher score
-            scored.append((score, _key_det(c), c))
-
-        # Sort: score descending, then deterministic tie-break ascending
-        scored.sort(key=lambda t: (-t[0], t[1]))
-        return [c for _, __, c in scored[:max(0, int(k))]]
+        groups = group_by_skill(candidates)
+        return top_k_by_skill(groups, self.skill_scores(user_id, groups, now), k)
+
+    def skill_scores(self, user_id: str, skills: Iterable[str], now: float | None = None) -> Dict[str, float]:
+        # Score depends only on the skill's mastery, so look it up once per skill.
+        get = self.bkt.get_mastery if now is None else partial(self.bkt.get_mastery, now=now)
+        return {skill: 1.0 - get(user_id, skill) for skill in skills}  # lower mastery → higher score
+
+    def next_items_batch(
+        self,
+        user_ids: Sequence[str],
+        candidates: Iterable[Dict[str, Any]],
+        k: int = 5,
+        now: float | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        :meth:`next_items` for many users over one shared candidate list.
+
+        Candidates are grouped and each skill's k best items picked once; the
+        users x skills mastery block is gathered in one call and each user's
+        top skills chosen with a partition instead of a sort. Results equal
+        per-user :meth:`next_items` calls (for time-aware models, with the
+        same ``now``).
+        """
+        k = max(0, int(k))
+        user_ids = list(user_ids)
+        groups = group_by_skill(candidates)
+        if k == 0 or not groups:
+            return [[] for _ in user_ids]
+        # Columns in skill order, so partition ties resolve like top_k_by_skill.
+        skills = sorted(groups)
+        heads = [heapq.nsmallest(k, groups[skill], key=_key_det) for skill in skills]
+        if now is None:
+            mastery = self.bkt.mastery_block(user_ids, skills)
+        else:
+            mastery = self.bkt.mastery_block(user_ids, skills, now=now)
+        scores = 1.0 - mastery
+        # Every skill contributes at least one item, so k skills always suffice.
+        chosen = top_columns(scores, k)
+        out: List[List[Dict[str, Any]]] = []
+        for row, mask in zip(scores, chosen):
+            cols = np.flatnonzero(mask)
+            picked: List[Dict[str, Any]] = []
+            for j in cols[np.argsort(-row[cols], kind="stable")].tolist():
+                picked.extend(heads[j][: k - len(picked)])
+                if len(picked) >= k:
+                    break
+            out.append(picked)
+        return out
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import bisect
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .recommender import Item
+
+
+class CatalogIndex(MutableMapping[str, "Item"]):
+    """
+    ``item_id -> Item`` mapping that also keeps items bucketed by skill.
+
+    Each bucket holds the skill's item IDs sorted ascending, so ranking can
+    walk buckets in order without touching the rest of the catalog. Setting
+    or deleting an item updates its bucket in place (a bisect insert), so the
+    index never needs a rebuild.
+    """
+
+    def __init__(self, items: Optional[Mapping[str, Item]] = None) -> None:
+        self._items: Dict[str, Item] = dict(items or {})
+        self._buckets: Dict[str, List[str]] = {}
+        for item_id, item in self._items.items():
+            self._buckets.setdefault(item.skill_id, []).append(item_id)
+        for bucket in self._buckets.values():
+            bucket.sort()
+
+    def __getitem__(self, item_id: str) -> Item:
+        return self._items[item_id]
+
+    def __setitem__(self, item_id: str, item: Item) -> None:
+        if item_id in self._items:
+            del self[item_id]
+        self._items[item_id] = item
+        bisect.insort(self._buckets.setdefault(item.skill_id, []), item_id)
+
+    def __delitem__(self, item_id: str) -> None:
+        item = self._items.pop(item_id)
+        bucket = self._buckets[item.skill_id]
+        del bucket[bisect.bisect_left(bucket, item_id)]
+        if not bucket:
+            del self._buckets[item.skill_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._items
+
+    def skills(self) -> Iterable[str]:
+        return self._buckets.keys()
+
+    def bucket(self, skill_id: str) -> List[str]:
+        """Item IDs of one skill, sorted ascending. Do not mutate."""
+        return self._buckets.get(skill_id, [])
+
+    def buckets(self) -> Iterable[Tuple[str, List[str]]]:
+        return self._buckets.items()
+
+    def group(self, item_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Bucket a subset of item IDs by skill, sorted ascending; unknown IDs are dropped."""
+        groups: Dict[str, List[str]] = {}
+        items = self._items
+        for item_id in item_ids:
+            item = items.get(item_id)
+            if item is not None:
+                groups.setdefault(item.skill_id, []).append(item_id)
+        for bucket in groups.values():
+            bucket.sort()
+        return groups
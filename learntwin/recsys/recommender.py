@@ -1,7 +1,13 @@
 ﻿from __future__ import annotations
-from typing import List, Dict, Tuple
+import heapq
+from functools import partial
+from itertools import islice
+from typing import Iterable, List, Dict, Sequence, Set
 from dataclasses import dataclass
+import numpy as np
 from learntwin.models.models_bkt import BKTModel
+from learntwin.utils import top_columns
+from .catalog import CatalogIndex
 @dataclass
 class Item:
     item_id: str
@@ -9,15 +15,113 @@ class Item:
     difficulty: float = 0.5
 
 class Recommender:
+    """
+    Ranks catalog items by score descending, ties broken by item_id descending.
+
+    The catalog is indexed by skill once (see :class:`CatalogIndex`); add or
+    remove items through ``self.catalog`` so the index stays current.
+    ``score`` must depend only on the item's skill: it is called once per
+    skill, with any item of that skill. Time-aware models are scored on
+    decayed mastery; ``now`` pins the read time for a whole ranking.
+    """
     def __init__(self, bkt: BKTModel, catalog: Dict[str, Item]):
         self.bkt = bkt
-        self.catalog = catalog
-    def score(self, user_id: str, item: Item) -> float:
-        p = self.bkt.get_mastery(user_id, item.skill_id)
+        self.catalog = CatalogIndex(catalog)
+    def score(self, user_id: str, item: Item, now: float | None = None) -> float:
+        if now is None:
+            p = self.bkt.get_mastery(user_id, item.skill_id)
+        else:
+            p = self.bkt.get_mastery(user_id, item.skill_id, now=now)
         return 1.0 - abs(p - 0.5)
-    def next_items(self, user_id: str, k: int = 5, allow_items: List[str] | None = None) -> List[str]:
-        pool = allow_items or list(self.catalog.keys())
-        scored: List[Tuple[float, str]] = [(self.score(user_id, self.catalog[i]), i) for i in pool if i in self.catalog]
-        scored.sort(reverse=True)
-        return [i for _, i in scored[:k]] 
+    def next_items(
+        self, user_id: str, k: int = 5, allow_items: List[str] | None = None, now: float | None = None
+    ) -> List[str]:
+        if k <= 0:
+            return []
+        allowed: Set[str] | None = None
+        if not allow_items:
+            buckets: Dict[str, List[str]] = dict(self.catalog.buckets())
+        elif len(allow_items) < len(self.catalog):
+            buckets = self.catalog.group(set(allow_items))
+        else:
+            # Large allow-lists: walk the prebuilt buckets and test membership.
+            allowed = set(allow_items)
+            buckets = dict(self.catalog.buckets())
+        return self.merge_buckets(buckets, self.group_by_score(user_id, buckets, now), k, allowed)
+    def group_by_score(self, user_id: str, buckets: Dict[str, List[str]], now: float | None = None) -> Dict[float, List[str]]:
+        """Score each skill once and group skills by equal score."""
+        by_score: Dict[float, List[str]] = {}
+        score = self.score if now is None else partial(self.score, now=now)
+        for skill, bucket in buckets.items():
+            s = score(user_id, self.catalog[bucket[0]])
+            by_score.setdefault(s, []).append(skill)
+        return by_score
+    @staticmethod
+    def merge_buckets(
+        buckets: Dict[str, List[str]], by_score: Dict[float, List[str]], k: int, allowed: Set[str] | None = None
+    ) -> List[str]:
+        """First k items by score descending; skills with equal scores are merged on item_id."""
+        out: List[str] = []
+        for s in sorted(by_score, reverse=True):
+            streams: List[Iterable[str]] = [reversed(buckets[skill]) for skill in by_score[s]]
+            if allowed is not None:
+                streams = [(i for i in st if i in allowed) for st in streams]
+            merged = streams[0] if len(streams) == 1 else heapq.merge(*streams, reverse=True)
+            out.extend(islice(merged, k - len(out)))
+            if len(out) >= k:
+                break
+        return out
+    def next_items_batch(
+        self,
+        user_ids: Sequence[str],
+        k: int = 5,
+        allow_items: List[str] | None = None,
+        now: float | None = None,
+    ) -> List[List[str]]:
+        """
+        :meth:`next_items` for many users sharing one ``allow_items`` filter.
 
+        Buckets are filtered and cut to their k best items once, mastery is
+        gathered as one users x skills block, and each user's candidate skills
+        are chosen with a partition (keeping every skill tied at the cut-off,
+        whose items interleave by item_id). Results equal per-user
+        :meth:`next_items` calls. A subclass that overrides :meth:`score` is
+        served by exactly those calls.
+        """
+        user_ids = list(user_ids)
+        if type(self).score is not Recommender.score:
+            return [self.next_items(u, k=k, allow_items=allow_items, now=now) for u in user_ids]
+        if k <= 0:
+            return [[] for _ in user_ids]
+        if allow_items:
+            buckets: Dict[str, List[str]] = self.catalog.group(set(allow_items))
+        else:
+            buckets = dict(self.catalog.buckets())
+        buckets = {skill: b for skill, b in buckets.items() if b}
+        if not buckets:
+            return [[] for _ in user_ids]
+        skills = list(buckets)
+        heads = [buckets[skill][-k:][::-1] for skill in skills]  # item_id descending
+        if now is None:
+            mastery = self.bkt.mastery_block(user_ids, skills)
+        else:
+            mastery = self.bkt.mastery_block(user_ids, skills, now=now)
+        scores = 1.0 - np.abs(mastery - 0.5)
+        chosen = top_columns(scores, k, keep_ties=True)
+        out: List[List[str]] = []
+        for row, mask in zip(scores, chosen):
+            cols = np.flatnonzero(mask)
+            cols = cols[np.argsort(-row[cols], kind="stable")].tolist()
+            picked: List[str] = []
+            start = 0
+            while start < len(cols) and len(picked) < k:
+                # Equal-score skills are merged on item_id, as in next_items.
+                stop = start + 1
+                while stop < len(cols) and row[cols[stop]] == row[cols[start]]:
+                    stop += 1
+                streams = [heads[j] for j in cols[start:stop]]
+                merged = streams[0] if len(streams) == 1 else heapq.merge(*streams, reverse=True)
+                picked.extend(islice(merged, k - len(picked)))
+                start = stop
+            out.append(picked)
+        return out
@@ -0,0 +1,8 @@
+"""Asyncio HTTP serving layer for ``docs/api_contract.json``."""
+from __future__ import annotations
+
+from .app import App, serve
+from .batcher import MicroBatcher
+from .histogram import LatencyHistogram
+
+__all__ = ["App", "serve", "MicroBatcher", "LatencyHistogram"]
@@ -0,0 +1,178 @@
+"""
+Minimal asyncio HTTP/1.1 server for ``docs/api_contract.json``.
+
+Endpoints (JSON in, JSON out)::
+
+    POST /get_mastery   {"user_id", "skill_id"}            -> {"user_id", "skill_id", "mastery"}
+    POST /next_items    {"user_id", "candidates", "k"}     -> {"user_id", "items"}
+    GET  /metrics       per-endpoint latency histograms and batching counters
+
+Concurrent ``get_mastery`` and ``next_items`` requests are coalesced by a
+:class:`MicroBatcher` and answered with one vectorised mastery lookup per
+batch. Run with ``python -m learntwin.serving.app [--snapshot DIR]``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.models_bkt import BKTModel
+from .. import recommender
+from .batcher import MicroBatcher
+from .histogram import LatencyHistogram
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+_MAX_BODY = 16 * 1024 * 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _require_str(req: Dict[str, Any], key: str) -> str:
+    value = req.get(key)
+    if not isinstance(value, str) or not value:
+        raise BadRequest(f"{key} must be a non-empty string")
+    return value
+
+
+class App:
+    """Request handlers and batchers around one :class:`BKTModel`."""
+
+    def __init__(self, model: Optional[BKTModel] = None, window: float = 0.001, max_batch: int = 512) -> None:
+        self.model = model or BKTModel()
+        self.mastery_batcher: MicroBatcher = MicroBatcher(self._mastery_batch, window, max_batch)
+        self.next_items_batcher: MicroBatcher = MicroBatcher(self._next_items_batch, window, max_batch)
+        self.histograms: Dict[str, LatencyHistogram] = {
+            "get_mastery": LatencyHistogram(),
+            "next_items": LatencyHistogram(),
+        }
+
+    def _mastery_batch(self, reqs: List[Tuple[str, str]]) -> List[float]:
+        users = [u for u, _ in reqs]
+        skills = [s for _, s in reqs]
+        return self.model.get_mastery_many(users, skills).tolist()
+
+    def _next_items_batch(self, reqs: List[Tuple[str, List[Dict[str, Any]], int]]) -> List[List[Dict[str, Any]]]:
+        grouped = [recommender.group_by_skill(cands) for _, cands, _ in reqs]
+        users = [u for (u, _, _), groups in zip(reqs, grouped) for _ in groups]
+        skills = [s for groups in grouped for s in groups]
+        mastery = iter(self.model.get_mastery_many(users, skills).tolist())
+        out = []
+        for (_, _, k), groups in zip(reqs, grouped):
+            scores = {skill: 1.0 - next(mastery) for skill in groups}
+            # Looked up on the module so learntwin.instrument can time the sort stage.
+            out.append(recommender.top_k_by_skill(groups, scores, k))
+        return out
+
+    async def get_mastery(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        user_id, skill_id = _require_str(req, "user_id"), _require_str(req, "skill_id")
+        mastery = await self.mastery_batcher.submit((user_id, skill_id))
+        return {"user_id": user_id, "skill_id": skill_id, "mastery": mastery}
+
+    async def next_items(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = _require_str(req, "user_id")
+        cands = req.get("candidates")
+        if not isinstance(cands, list) or not all(isinstance(c, dict) for c in cands):
+            raise BadRequest("candidates must be a list of objects")
+        k = req.get("k", 5)
+        if not isinstance(k, int) or isinstance(k, bool):
+            raise BadRequest("k must be an int")
+        items = await self.next_items_batcher.submit((user_id, cands, k))
+        return {"user_id": user_id, "items": [{"item_id": c["item_id"], "skill_id": c["skill_id"]} for c in items]}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "latency": {name: h.snapshot() for name, h in self.histograms.items()},
+            "batching": {
+                name: {"batches": b.batches, "items": b.items}
+                for name, b in (("get_mastery", self.mastery_batcher), ("next_items", self.next_items_batcher))
+            },
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == "/metrics":
+            return (200, self.metrics()) if method == "GET" else (405, {"error": "use GET"})
+        handler = {"/get_mastery": self.get_mastery, "/next_items": self.next_items}.get(path)
+        if handler is None:
+            return 404, {"error": f"no route {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        t0 = time.perf_counter()
+        try:
+            req = json.loads(body or b"{}")
+            if not isinstance(req, dict):
+                raise BadRequest("request body must be a JSON object")
+            return 200, await handler(req)
+        except (BadRequest, json.JSONDecodeError, UnicodeDecodeError) as exc:
+            return 400, {"error": str(exc)}
+        finally:
+            self.histograms[path[1:]].observe(time.perf_counter() - t0)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                if length > _MAX_BODY:
+                    raise ValueError("request body too large")
+                body = await reader.readexactly(length)
+                try:
+                    status, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                except Exception as exc:  # keep the connection usable after a handler bug
+                    status, payload = 500, {"error": repr(exc)}
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # malformed request line/headers or client went away
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.base_events.Server:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(app: App, host: str = "127.0.0.1", port: int = 8080) -> None:
+    server = await app.start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve docs/api_contract.json over HTTP")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--snapshot", default=None, help="BKTModel snapshot directory to serve")
+    ap.add_argument("--window-ms", type=float, default=1.0, help="micro-batching window")
+    args = ap.parse_args()
+    model = BKTModel.load(args.snapshot) if args.snapshot else BKTModel()
+    app = App(model, window=args.window_ms / 1000.0)
+    print(f"serving on http://{args.host}:{args.port}")
+    asyncio.run(serve(app, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
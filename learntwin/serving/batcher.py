@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces calls arriving within ``window`` seconds into one batch call.
+
+    ``fn`` receives the list of submitted arguments and must return one
+    result per argument, in order. A batch is flushed when the window
+    expires or ``max_batch`` arguments are queued. If ``fn`` raises, every
+    caller in that batch gets the exception.
+    """
+
+    def __init__(self, fn: Callable[[List[T]], Sequence[R]], window: float = 0.001, max_batch: int = 512) -> None:
+        self.fn = fn
+        self.window = window
+        self.max_batch = max(1, int(max_batch))
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, arg: T) -> R:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        self._pending.append((arg, fut))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return await fut
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results: Sequence[Any] = self.fn([arg for arg, _ in batch])
+        except Exception as exc:  # hand the failure to every waiter
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut), res in zip(batch, results):
+            if not fut.done():
+                fut.set_result(res)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import bisect
+from typing import Any, Dict, List, Sequence
+
+# Upper bounds in milliseconds; the last bucket is open-ended.
+DEFAULT_BOUNDS_MS: Sequence[float] = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, bounds_ms: Sequence[float] = DEFAULT_BOUNDS_MS) -> None:
+        self.bounds_ms: List[float] = sorted(bounds_ms)
+        self.counts: List[int] = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-th percentile; 0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds_ms[i] if i < len(self.bounds_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.sum_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "buckets": [
+                {"le_ms": b, "count": c}
+                for b, c in zip(list(self.bounds_ms) + [float("inf")], self.counts)
+            ],
+        }
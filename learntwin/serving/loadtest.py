@@ -0,0 +1,143 @@
+"""
+Load-test client for :mod:`learntwin.serving.app`.
+
+Opens ``concurrency`` keep-alive connections and sends a mix of
+``get_mastery`` and ``next_items`` requests, then prints client-side latency
+percentiles per endpoint and the server's own ``/metrics``. With
+``--local`` it starts an in-process server on a free port first::
+
+    python -m learntwin.serving.loadtest --local --requests 20000 --concurrency 64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .app import App
+from .histogram import LatencyHistogram
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    path: str,
+    payload: Any = None,
+    close: bool = False,
+) -> Tuple[int, Any]:
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: loadtest\r\nContent-Type: application/json\r\n"
+        f"Connection: {'close' if close else 'keep-alive'}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def _make_request(rnd: random.Random, users: int, skills: int, candidates: int, next_items_share: float) -> Tuple[str, Dict[str, Any]]:
+    user = f"u{rnd.randrange(users)}"
+    if rnd.random() >= next_items_share:
+        return "/get_mastery", {"user_id": user, "skill_id": f"s{rnd.randrange(skills)}"}
+    cands = [{"item_id": f"i{rnd.randrange(100000)}", "skill_id": f"s{rnd.randrange(skills)}"} for _ in range(candidates)]
+    return "/next_items", {"user_id": user, "candidates": cands, "k": 5}
+
+
+async def run(
+    host: str,
+    port: int,
+    requests: int = 10000,
+    concurrency: int = 32,
+    users: int = 1000,
+    skills: int = 50,
+    candidates: int = 20,
+    next_items_share: float = 0.2,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Drive the server and return client latency snapshots plus server metrics."""
+    hists = {"/get_mastery": LatencyHistogram(), "/next_items": LatencyHistogram()}
+    errors = 0
+    remaining = requests
+
+    async def worker(wid: int) -> None:
+        nonlocal remaining, errors
+        rnd = random.Random(seed * 1000003 + wid)
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                path, payload = _make_request(rnd, users, skills, candidates, next_items_share)
+                t0 = time.perf_counter()
+                # The last request closes the connection so the server side finishes cleanly.
+                status, _ = await _request(reader, writer, "POST", path, payload, close=remaining <= 0)
+                hists[path].observe(time.perf_counter() - t0)
+                errors += status != 200
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_metrics = await _request(reader, writer, "GET", "/metrics", close=True)
+    writer.close()
+    await writer.wait_closed()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "client": {path[1:]: h.snapshot() for path, h in hists.items()},
+        "server": server_metrics,
+    }
+
+
+async def _run_local(app: Optional[App], **kwargs: Any) -> Dict[str, Any]:
+    server = await (app or App()).start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await run("127.0.0.1", port, **kwargs)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Load-test a learntwin.serving instance")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--local", action="store_true", help="start an in-process server on a free port")
+    ap.add_argument("--requests", type=int, default=10000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--candidates", type=int, default=20)
+    ap.add_argument("--next-items-share", type=float, default=0.2)
+    args = ap.parse_args()
+    kwargs = dict(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        candidates=args.candidates,
+        next_items_share=args.next_items_share,
+    )
+    if args.local:
+        report = asyncio.run(_run_local(None, **kwargs))
+    else:
+        report = asyncio.run(run(args.host, args.port, **kwargs))
+    for name, snap in report["client"].items():
+        print(f"{name:<12} n={snap['count']:<7} p50={snap['p50_ms']}ms p90={snap['p90_ms']}ms p99={snap['p99_ms']}ms")
+    print(f"throughput: {report['throughput_rps']:.0f} req/s, errors: {report['errors']}")
+    print(json.dumps(report["server"]["batching"]))
+
+
+if __name__ == "__main__":
+    main()
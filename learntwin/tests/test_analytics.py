@@ -0,0 +1,48 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.analytics import CohortAnalytics, Rule, RuleSet, flag_at_risk
+CSV = """student_id,student_name,avg_score,attendance_rate,last_activity_days_ago,class_id,cohort
+s1,Ana,72,0.95,2,7A,2025
+s2,Ben,55,0.9,1,7A,2025
+s3,Cy,80,0.7,3,7B,2025
+s4,Di,90,0.99,,7B,2024
+s5,Ed,x,0.85,30,7B,2024
+"""
+def test_rules_match_demo_semantics_and_group_aggregates(tmp_path):
+    (tmp_path / "c.csv").write_text(CSV, encoding="utf-8")
+    ca = CohortAnalytics.from_csv(tmp_path / "c.csv", chunk_size=2)
+    assert [sid for sid, _ in ca.at_risk()] == ["s2", "s3", "s5"]
+    by_class = ca.summary("class_id")
+    assert by_class["7A"]["students"] == 2 and by_class["7A"]["at_risk"] == 1
+    assert by_class["7B"]["rule_hits"] == {"low_score": 1, "low_attendance": 1, "inactive": 1}
+    assert by_class["7B"]["mean_avg_score"] == pytest.approx((80 + 90 + 0) / 3)
+    assert ca.summary("cohort")["2024"]["students"] == 2 and ca.totals()["at_risk"] == 3
+def test_incremental_upsert_touches_only_changed_rows():
+    ca = CohortAnalytics(RuleSet((Rule("low", "avg_score", "<", 50),)))
+    ids = np.array([f"s{i}" for i in range(100)])
+    score = np.arange(100, dtype=float)
+    cls = np.array(["A", "B"] * 50)
+    assert ca.upsert({"student_id": ids, "avg_score": score, "class_id": cls}) == 100
+    score2 = score.copy(); score2[[3, 60]] = [99, 10]
+    cls2 = cls.copy(); cls2[10] = "C"
+    assert ca.upsert({"student_id": ids, "avg_score": score2, "class_id": cls2}) == 3
+    fresh = CohortAnalytics(ca.rules); fresh.upsert({"student_id": ids, "avg_score": score2, "class_id": cls2})
+    assert ca.summary() == fresh.summary() and ca.totals() == fresh.totals()
+    assert ca.remove(["s0", "nobody"]) == 1 and ca.totals()["students"] == 99
+    assert list(flag_at_risk({"avg_score": [10, 70]}, ca.rules)) == [True, False]
+def test_save_load_resumes_incrementally(tmp_path):
+    (tmp_path / "c.csv").write_text(CSV, encoding="utf-8")
+    ca = CohortAnalytics.from_csv(tmp_path / "c.csv")
+    ca.save(tmp_path / "state.npz")
+    r = CohortAnalytics.load(tmp_path / "state.npz")
+    assert r.rules == ca.rules and r.at_risk() == ca.at_risk()
+    assert r.summary("cohort") == ca.summary("cohort") and r.totals() == ca.totals()
+    chunk = {"student_id": ["s1", "s2"], "student_name": ["Ana", "Ben"], "avg_score": [72.0, 95.0],
+             "attendance_rate": [0.95, 0.9], "last_activity_days_ago": [2.0, 1.0], "class_id": ["7A", "7A"], "cohort": ["2025", "2025"]}
+    assert r.upsert(chunk) == 1 and [sid for sid, _ in r.at_risk()] == ["s3", "s5"]
+    strict = RuleSet((Rule("low", "avg_score", "<", 85),))
+    assert [sid for sid, _ in CohortAnalytics.load(tmp_path / "state.npz", strict).at_risk()] == ["s1", "s2", "s3", "s5"]
+def test_rules_must_use_stored_columns():
+    with pytest.raises(ValueError, match="grade_level"):
+        CohortAnalytics(RuleSet((Rule("old", "grade_level", ">", 8),)))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.models_bkt import BKTModel, BKTParams
+def _log(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    users = [f"u{i}" for i in rng.integers(0, 40, n)]
+    skills = [f"s{i}" for i in rng.integers(0, 6, n)]
+    return users, skills, rng.integers(0, 2, n), rng.permutation(n).astype(float)
+def test_update_batch_matches_sequential_in_ts_order():
+    users, skills, correct, ts = _log()
+    for dtype in (np.float64, np.float32):
+        seq = BKTModel(BKTParams(), dtype=dtype); bat = BKTModel(BKTParams(), dtype=dtype)
+        expected = np.empty(len(ts))
+        for i in np.argsort(ts, kind="stable"):
+            expected[i] = seq.update(users[i], skills[i], correct[i])
+        got = bat.update_batch(users, skills, correct, ts=ts)
+        assert np.array_equal(got, expected)
+        for u, s in zip(users, skills):
+            assert bat.get_mastery(u, s) == seq.get_mastery(u, s)
+def test_update_batch_iso_ts_and_input_order():
+    a = BKTModel(); b = BKTModel()
+    a.update_batch(["u1", "u1"], ["add", "add"], [0, 1], ts=["2025-11-11T10:01:00Z", "2025-11-11T10:00:00Z"])
+    b.update("u1", "add", True); b.update("u1", "add", False)
+    assert a.get_mastery("u1", "add") == b.get_mastery("u1", "add")
+    assert len(BKTModel().update_batch([], [], [])) == 0
+def test_update_batch_length_mismatch_leaves_no_state():
+    m = BKTModel()
+    with pytest.raises(ValueError):
+        m.update_batch(["x", "y"], ["s", "s"], [1])
+    with pytest.raises(ValueError):
+        m.update_batch(["x"], ["s"], [1], ts=[0.0, 1.0])
+    assert len(m.users) == 0 and len(m.skills) == 0
+def test_update_batch_numeric_ts_with_gaps():
+    a = BKTModel(); b = BKTModel()
+    a.update_batch(["u1", "u1", "u1"], ["add"] * 3, [0, 1, 1], ts=[2.0, None, 1.0])
+    b.update("u1", "add", True); b.update("u1", "add", False); b.update("u1", "add", True)
+    assert a.get_mastery("u1", "add") == b.get_mastery("u1", "add")
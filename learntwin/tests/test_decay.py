@@ -0,0 +1,82 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.feed import MasteryCache
+from learntwin.models.models_bkt import BKTModel, BKTParams
+from learntwin.recommender import Recommender
+from learntwin.recsys.recommender import Item, Recommender as CatalogRecommender
+DAY = 86400.0
+TABLE = {"add": BKTParams(p_init=0.3, p_learn=0.2, half_life=DAY), "sub": BKTParams(half_life=7 * DAY)}
+def _model(**kw):
+    return BKTModel(skill_params=TABLE, time_aware=True, clock=lambda: 0.0, **kw)
+def test_reads_decay_lazily_toward_p_init():
+    m = _model()
+    assert m.update("u1", "add", True, ts=0.0) == 0.5
+    assert m.get_mastery("u1", "add", now=0.0) == 0.5
+    assert m.get_mastery("u1", "add", now=DAY) == pytest.approx(0.4)
+    assert m.get_mastery("u1", "add", now=-DAY) == 0.5  # no decay backwards in time
+    m.update("u1", "mul", True, ts=0.0)  # no half_life: never decays
+    assert m.get_mastery("u1", "mul", now=100 * DAY) == m.get_mastery("u1", "mul", now=0.0)
+    assert m.get_mastery("u2", "add", now=DAY) == 0.3 and m.get_mastery("u1", "zzz", now=DAY) == 0.2
+    assert m.update("u1", "add", True, ts=DAY) == pytest.approx(0.6)  # decays to 0.4 first
+    assert m.mastery_matrix(now=DAY)[0, 0] == pytest.approx(0.6) and m._store.matrix()[0, 0] == pytest.approx(0.6)
+    assert BKTModel().get_mastery("u", "s", now=1e9) == 0.2 and not BKTModel().time_aware
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_batch_matches_sequential(dtype):
+    rng = np.random.default_rng(0)
+    n = 600
+    users = np.char.add("u", rng.integers(0, 15, n).astype(str))
+    skills = rng.choice(["add", "sub", "mul"], n)
+    correct = rng.integers(0, 2, n)
+    ts = rng.random(n) * 30 * DAY
+    ts[rng.random(n) < 0.1] = np.nan
+    batch = BKTModel(skill_params=TABLE, time_aware=True, dtype=dtype)
+    out = batch.update_batch(users, skills, correct, ts)
+    seq = BKTModel(skill_params=TABLE, time_aware=True, dtype=dtype)
+    # Per pair: ts order, NaN ts last, input order on ties.
+    order = sorted(range(n), key=lambda i: (np.isnan(ts[i]), 0.0 if np.isnan(ts[i]) else ts[i], i))
+    expected = np.empty(n)
+    for i in order:
+        expected[i] = seq.update(users[i], skills[i], correct[i], ts=ts[i])
+    assert np.array_equal(out, expected)
+    # Interning order differs between the two, so compare by ID.
+    later = 40 * DAY
+    assert np.array_equal(batch.get_mastery_many(users, skills, now=later), seq.get_mastery_many(users, skills, now=later))
+    stamp = lambda m: {(u, s): m._store.timestamps()[m.users.get(u), m.skills.get(s)] for u, s in zip(users, skills)}
+    assert str(stamp(batch)) == str(stamp(seq))
+    now = 35 * DAY
+    many = batch.get_mastery_many(users, skills, now=now)
+    assert many.tolist() == [batch.get_mastery(u, s, now=now) for u, s in zip(users, skills)]
+    u0 = users[0]
+    row = np.array([batch.get_mastery(u0, s, now=now) for s in batch.skills]).astype(dtype)  # views keep the store dtype
+    assert np.array_equal(batch.user_mastery(u0, now=now), row)
+    col = batch.skill_mastery("sub", now=now)
+    assert col.tolist() == pytest.approx([batch.get_mastery(u, "sub", now=now) for u in batch.users])
+def test_snapshot_keeps_timestamps(tmp_path):
+    m = _model()
+    m.update_batch(["u1", "u2"], ["add", "sub"], [1, 0], [0.0, DAY])
+    m.save(tmp_path / "snap")
+    m.update("u3", "add", True, ts=2 * DAY)
+    m.save_delta(tmp_path / "snap")
+    r = BKTModel.load(tmp_path / "snap")
+    assert r.time_aware and np.array_equal(r._store.timestamps(), m._store.timestamps(), equal_nan=True)
+    assert np.array_equal(r.mastery_matrix(now=5 * DAY), m.mastery_matrix(now=5 * DAY))
+def test_recommenders_rank_on_decayed_mastery():
+    m = _model()
+    m.update("u1", "add", True, ts=0.0); m.update("u1", "add", True, ts=0.0)  # 0.7, decays toward 0.3
+    m.update("u1", "mul", True, ts=0.0)  # 0.35, no half_life
+    cands = [{"item_id": "a", "skill_id": "add"}, {"item_id": "m", "skill_id": "mul"}]
+    rec = Recommender(m)
+    assert [c["item_id"] for c in rec.next_items("u1", cands, k=1, now=0.0)] == ["m"]
+    assert [c["item_id"] for c in rec.next_items("u1", cands, k=1, now=30 * DAY)] == ["a"]
+    m.update("u2", "add", True, ts=0.0)  # exactly 0.5 at first
+    m.update("u2", "mul", True, ts=0.0)
+    cat = CatalogRecommender(m, {"a": Item("a", "add"), "m": Item("m", "mul")})
+    assert cat.next_items("u2", k=1, now=0.0) == ["a"]
+    assert cat.next_items("u2", k=1, now=30 * DAY) == ["m"]
+def test_cache_applies_decay_on_hits():
+    m = _model(feed_capacity=16)
+    m.update("u1", "add", True, ts=0.0)
+    cache = MasteryCache(m)
+    assert np.array_equal(cache.user_mastery("u1", now=0.0), m.user_mastery("u1", now=0.0))
+    assert np.array_equal(cache.user_mastery("u1", now=DAY), m.user_mastery("u1", now=DAY)) and cache.hits == 1
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.feed import ChangeFeed, FeedGap, MasteryCache
+from learntwin.models.models_bkt import BKTModel, BKTParams
+def test_feed_records_single_and_batch_writes():
+    m = BKTModel(feed_capacity=100)
+    m.update("u1", "add", True)
+    m.update_batch(["u2", "u1", "u2"], ["sub", "add", "sub"], [1, 0, 1], ts=[3.0, 1.0, 2.0])
+    ch = m.changes()
+    assert [c.seq for c in ch] == [0, 1, 2, 3]
+    assert [(c.user_id, c.skill_id) for c in ch] == [("u1", "add"), ("u1", "add"), ("u2", "sub"), ("u2", "sub")]
+    assert ch[0].old == 0.2 and ch[1].old == ch[0].new and ch[3].old == ch[2].new
+    assert ch[-1].new == m.get_mastery("u2", "sub")
+    assert m.changes(3) == ch[3:] and m.changes(4) == [] and m.changes(1, limit=1) == ch[1:2]
+    with pytest.raises(ValueError):
+        BKTModel().changes()
+def test_feed_ring_drops_oldest():
+    f = ChangeFeed(4)
+    f.extend(np.arange(6), np.zeros(6, int), np.zeros(6), np.ones(6))
+    f.append(9, 1, 0.5, 0.6)
+    assert (f.head, f.tail, len(f)) == (7, 3, 4)
+    seq, u, *_ = f.read(3)
+    assert seq.tolist() == [3, 4, 5, 6] and u.tolist() == [3, 4, 5, 9]
+    with pytest.raises(FeedGap):
+        f.read(2)
+def test_cache_is_invalidated_precisely():
+    m = BKTModel()
+    m.update_batch(["a", "b"], ["x", "y"], [1, 1])
+    now = [0.0]
+    cache = MasteryCache(m, maxsize=2, ttl=10, clock=lambda: now[0])
+    assert np.array_equal(cache.user_mastery("a"), m.user_mastery("a"))
+    cache.user_mastery("b"); cache.user_mastery("a")
+    assert cache.hits == 1 and cache.misses == 2
+    m.update("b", "x", False)
+    assert cache.get_mastery("b", "x") == m.get_mastery("b", "x")
+    assert cache.get_mastery("a", "x") == m.get_mastery("a", "x")
+    assert cache.invalidations == 1 and cache.hits == 2
+    m.update("c", "z", True)  # new skill column: cached "a" is padded from defaults
+    assert np.array_equal(cache.user_mastery("a"), m.user_mastery("a")) and cache.hits == 3
+    cache.user_mastery("c")
+    assert len(cache) == 2 and "b" not in cache._entries  # LRU eviction
+    now[0] = 11.0
+    cache.user_mastery("a")
+    assert cache.misses == 5  # TTL expiry
+    m.set_skill_params({"w": BKTParams(p_init=0.9)})
+    assert cache.get_mastery("a", "w") == 0.9 and len(cache) == 1
+def test_cache_resyncs_after_feed_overflow():
+    m = BKTModel(feed_capacity=2)
+    cache = MasteryCache(m)
+    cache.user_mastery("a"); cache.user_mastery("b")
+    m.update_batch(["z"] * 5, ["x"] * 5, [1] * 5)
+    assert cache.sync() == 2 and len(cache) == 0
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import numpy as np
+from learntwin.fit import default_grid, fit_skills, params_table, read_params, write_fits
+from learntwin.models.models_bkt import BKTModel, BKTParams
+def _simulate(p: BKTParams, skill: str, n_users=200, n_steps=12, seed=0):
+    rng = np.random.default_rng(seed); users, skills, correct = [], [], []
+    for u in range(n_users):
+        known = rng.random() < p.p_init
+        for _ in range(n_steps):
+            right = rng.random() < (1 - p.p_slip if known else p.p_guess)
+            users.append(f"u{u}"); skills.append(skill); correct.append(int(right))
+            known = known or rng.random() < p.p_learn
+    return users, skills, correct
+def test_fit_recovers_params_and_is_worker_count_independent(tmp_path):
+    true = {"add": BKTParams(0.25, 0.2, 0.1, 0.2), "sub": BKTParams(0.65, 0.1, 0.05, 0.25)}
+    cols = [sum(z, []) for z in zip(*(_simulate(p, k, seed=i) for i, (k, p) in enumerate(true.items())))]
+    grid = default_grid()[::3]
+    inline = fit_skills(*cols, grid=grid, processes=1)
+    pooled = fit_skills(*cols, grid=grid, processes=2)
+    assert {k: f.params for k, f in inline.items()} == {k: f.params for k, f in pooled.items()}
+    assert abs(inline["add"].params.p_init - 0.25) <= 0.2 and inline["sub"].params.p_init > inline["add"].params.p_init
+    assert inline["add"].n_events == 2400 and inline["add"].log_likelihood < 0
+    write_fits(tmp_path / "params.csv", inline)
+    assert read_params(tmp_path / "params.csv") == params_table(inline)
+def test_model_uses_skill_params():
+    m = BKTModel(skill_params={"add": BKTParams(p_init=0.5, p_learn=0.3)})
+    assert m.get_mastery("u1", "add") == 0.5 and m.get_mastery("u1", "sub") == 0.2
+    m.update("u1", "sub", True)
+    assert m.get_mastery("u1", "add") == 0.5 and m.update("u1", "add", True) == 0.8
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import json
+from learntwin import instrument, io
+from learntwin.models.models_bkt import BKTModel
+from learntwin.recommender import Recommender
+from learntwin.recsys.recommender import Item, Recommender as CatalogRecommender
+from learntwin.serving.app import App
+def test_disabled_runs_original_functions():
+    originals = [owner.__dict__[attr] for owner, attr, _, _ in instrument.TARGETS]
+    with instrument.instrumented():
+        assert instrument.enabled() and BKTModel.__dict__["get_mastery"] is not originals[0]
+    assert not instrument.enabled()
+    assert [owner.__dict__[attr] for owner, attr, _, _ in instrument.TARGETS] == originals
+def test_counts_and_exports(tmp_path):
+    path = tmp_path / "interactions.csv"
+    path.write_text("user_id,item_id,skill_id,correct,ts\n" + "".join(f"u{i % 3},i{i},s{i % 2},1,2024-01-01T00:00:{i:02d}Z\n" for i in range(10)), encoding="utf-8")
+    m = BKTModel()
+    cands = [{"item_id": "i1", "skill_id": "s0"}, {"item_id": "i2", "skill_id": "s1"}]
+    with instrument.instrumented(instrument.Metrics()) as metrics:
+        assert io.ingest_interactions(m, path, chunk_size=4) == 10
+        m.update("u1", "s0", True)
+        m.get_mastery("u1", "s0"); m.get_mastery("u2", "s1")
+        Recommender(m).next_items("u1", cands, k=1)
+        cat = CatalogRecommender(m, {"i1": Item("i1", "s0"), "i2": Item("i2", "s1")})
+        assert cat.next_items("u1", k=1) == cat.next_items_batch(["u1"], k=1)[0]
+    m.get_mastery("u1", "s0")  # not counted once disabled
+    snap = metrics.snapshot()
+    assert snap["ingest.parse_chunk"]["count"] == 3 and snap["ingest.interactions"]["count"] == 1
+    assert snap["bkt.update_batch"]["count"] == 3 and snap["bkt.update"]["count"] == 1
+    assert snap["bkt.get_mastery"]["count"] == 1 + 2 + 2 + 2  # inside update, direct, candidate and catalog scoring
+    for op in ("candidates.score", "candidates.sort", "catalog.score", "catalog.sort", "catalog.next_items_batch"):
+        assert snap[f"recommender.{op}"]["count"] == 1
+    prom = metrics.to_prometheus()
+    assert 'learntwin_call_duration_seconds_count{op="bkt.get_mastery"} 7' in prom
+    assert 'learntwin_call_duration_seconds_bucket{op="bkt.get_mastery",le="+Inf"} 7' in prom
+    assert json.loads(metrics.to_json())["bkt.update"]["buckets"][-1]["le_ms"] == "+Inf"
+    metrics.reset()
+    assert metrics.snapshot() == {}
+def test_profile_block():
+    m = BKTModel()
+    with instrument.profile(memory=True) as report:
+        m.update_batch([f"u{i}" for i in range(500)], ["s"] * 500, [1] * 500)
+    assert report.seconds > 0 and report.peak_bytes > 0 and report.top_allocations
+    assert "update_batch" in report.text(limit=10)
+def test_nested_blocks_restore_target_and_state():
+    default = instrument.METRICS
+    m = BKTModel()
+    with instrument.instrumented() as outer:
+        with instrument.instrumented(instrument.Metrics()) as inner:
+            m.get_mastery("u", "s")
+        assert instrument.enabled() and instrument.METRICS is default is outer
+        m.get_mastery("u", "s")
+        App(m)._next_items_batch([("u", [{"item_id": "i1", "skill_id": "s"}], 1)])
+        snap = outer.snapshot()
+    assert not instrument.enabled() and instrument.METRICS is default
+    assert inner.snapshot()["bkt.get_mastery"]["count"] == 1 and snap["bkt.get_mastery"]["count"] == 1
+    assert snap["recommender.candidates.sort"]["count"] == 1
+    default.reset()
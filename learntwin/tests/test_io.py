@@ -0,0 +1,31 @@
+from __future__ import annotations
+from pathlib import Path
+import numpy as np
+import pytest
+from learntwin import io
+from learntwin.models.models_bkt import BKTModel
+SAMPLE = Path(__file__).resolve().parents[2] / "sample_data"
+def test_reads_headerless_bom_sample_in_chunks():
+    chunks = list(io.read_interactions(SAMPLE / "interactions.csv", chunk_size=2))
+    assert [len(c["user_id"]) for c in chunks] == [2, 1]
+    assert chunks[0]["user_id"][0] == "u1" and chunks[0]["correct"].dtype == np.int8
+    assert chunks[1]["ts"][0] - chunks[0]["ts"][0] == 120.0
+    assert list(next(io.read_items(SAMPLE / "items.csv"))["skill_id"]) == ["add", "add", "sub"]
+def test_header_by_name_and_cache_roundtrip(tmp_path, monkeypatch):
+    src = tmp_path / "interactions.csv"
+    src.write_text("﻿skill_id,user_id,correct\nadd,u1,1\nadd,u1,0\n", encoding="utf-8")
+    cache = tmp_path / "cache"
+    first = list(io.read_interactions(src, cache_dir=cache))
+    assert list(first[0]["user_id"]) == ["u1", "u1"] and np.isnan(first[0]["ts"]).all()
+    monkeypatch.setattr(io, "_parse_chunks", None)  # a cache hit must not parse CSV
+    cached = list(io.read_interactions(src, cache_dir=cache))
+    assert all(np.array_equal(first[0][c], cached[0][c]) for c in io.INTERACTIONS_COLUMNS[:4])
+    m, ref = BKTModel(), BKTModel()
+    assert io.ingest_interactions(m, src, cache_dir=cache) == 2
+    ref.update("u1", "add", True); ref.update("u1", "add", False)
+    assert m.get_mastery("u1", "add") == ref.get_mastery("u1", "add")
+def test_bad_value_names_file_and_rows(tmp_path):
+    src = tmp_path / "interactions.csv"
+    src.write_text("user_id,skill_id,correct\nu1,add,1\nu1,add,0\nu2,add,\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"interactions\.csv: bad 'correct' value in data rows 3-3"):
+        io.ingest_interactions(BKTModel(), src, chunk_size=2)
@@ -8,3 +8,67 @@ def test_next_items_deterministic_catalog_order_independent():
     r = Recommender(bkt, catalog)
     a = r.next_items("u1",k=2); b = r.next_items("u1",k=2)
     assert a==b and len(a)==2
+def test_next_items_matches_full_sort_with_ties():
+    import random
+    from learntwin.recommender import Recommender as CandRecommender, _key_det
+    bkt = BKTModel(BKTParams(p_init=0.2))
+    for u, s in [("u1", "s1"), ("u1", "s3"), ("u1", "s4")]:
+        bkt.update(u, s, 1)
+    rnd = random.Random(0)
+    cands = [{"item_id": f"i{rnd.randrange(40)}", "skill_id": f"s{rnd.randrange(6)}"} for _ in range(200)]
+    full = sorted(cands, key=lambda c: (-(1.0 - bkt.get_mastery("u1", c["skill_id"])), _key_det(c)))
+    for k in (0, 1, 7, 50, 500):
+        assert CandRecommender(bkt).next_items("u1", cands, k=k) == full[:k]
+    catalog = {c["item_id"]: Item(c["item_id"], c["skill_id"]) for c in cands}
+    r = Recommender(bkt, catalog)
+    ref = sorted(((r.score("u1", it), i) for i, it in catalog.items()), reverse=True)
+    assert r.next_items("u1", k=9) == [i for _, i in ref[:9]]
+def test_catalog_index_incremental_and_allow_items():
+    bkt = BKTModel(BKTParams(p_init=0.2)); bkt.update("u1", "s2", 1)
+    catalog = {f"i{n}": Item(f"i{n}", f"s{n % 3}") for n in range(30)}
+    r = Recommender(bkt, catalog)
+    def brute(pool):
+        return [i for _, i in sorted(((r.score("u1", r.catalog[i]), i) for i in set(pool) if i in r.catalog), reverse=True)]
+    assert r.next_items("u1", k=40) == brute(r.catalog)
+    r.catalog["new"] = Item("new", "s9"); del r.catalog["i4"]; r.catalog["i5"] = Item("i5", "s9")
+    assert r.catalog.bucket("s9") == ["i5", "new"] and "i4" not in r.catalog.bucket("s1")
+    assert r.next_items("u1", k=40) == brute(r.catalog)
+    small = ["i1", "i2", "i9", "nope"]; big = list(r.catalog) + ["nope"]
+    assert r.next_items("u1", k=3, allow_items=small) == brute(small)[:3]
+    assert r.next_items("u1", k=5, allow_items=big) == brute(big)[:5]
+def test_next_items_batch_matches_per_user_calls():
+    import random
+    import numpy as np
+    from learntwin.recommender import Recommender as CandRecommender
+    from learntwin.utils import top_columns
+    rnd = random.Random(1)
+    bkt = BKTModel(skill_params={"s2": BKTParams(p_init=0.5, half_life=3600.0)}, time_aware=True)
+    users = [f"u{n}" for n in range(25)] + ["ghost"]
+    for _ in range(300):  # sparse updates leave many ties at p_init
+        bkt.update(rnd.choice(users[:-1]), f"s{rnd.randrange(8)}", rnd.random() < 0.6, ts=rnd.random() * 7200)
+    cands = [{"item_id": f"i{rnd.randrange(60)}", "skill_id": f"s{rnd.randrange(9)}"} for _ in range(150)] + [{"item_id": "x"}]
+    cand_rec = CandRecommender(bkt)
+    catalog = Recommender(bkt, {c["item_id"]: Item(c["item_id"], c["skill_id"]) for c in cands if "skill_id" in c})
+    allow = [c["item_id"] for c in cands[::3]] + ["nope"]
+    for k in (0, 1, 3, 20, 500):
+        assert cand_rec.next_items_batch(users, cands, k=k, now=9000.0) == [cand_rec.next_items(u, cands, k=k, now=9000.0) for u in users]
+        for pool in (None, allow):
+            got = catalog.next_items_batch(users, k=k, allow_items=pool, now=9000.0)
+            assert got == [catalog.next_items(u, k=k, allow_items=pool, now=9000.0) for u in users]
+    class Custom(Recommender):
+        def score(self, user_id, item, now=None):
+            return -len(item.skill_id)
+    custom = Custom(bkt, dict(catalog.catalog))
+    assert custom.next_items_batch(users[:3], k=4) == [custom.next_items(u, k=4) for u in users[:3]]
+    assert cand_rec.next_items_batch([], cands) == [] and cand_rec.next_items_batch(["u1"], []) == [[]]
+    mask = top_columns(np.array([[1.0, 3.0, 3.0, 2.0], [0.0, 0.0, 0.0, 0.0]]), 2)
+    assert mask.tolist() == [[False, True, True, False], [True, True, False, False]]
+    assert top_columns(np.array([[1.0, 2.0, 2.0, 2.0]]), 2, keep_ties=True).sum() == 3
+def test_next_items_batch_on_sharded_model():
+    from learntwin.models.sharded import ShardedBKTModel
+    from learntwin.recommender import Recommender as CandRecommender
+    cands = [{"item_id": f"i{n}", "skill_id": f"s{n % 4}"} for n in range(12)]
+    with ShardedBKTModel(2) as sh:
+        sh.update_batch(["a", "b", "c", "a"], ["s1", "s2", "s3", "s0"], [1, 0, 1, 1])
+        rec = CandRecommender(sh)
+        assert rec.next_items_batch(["a", "b", "c", "d"], cands, k=5) == [rec.next_items(u, cands, k=5) for u in "abcd"]
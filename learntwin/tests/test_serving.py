@@ -0,0 +1,34 @@
+from __future__ import annotations
+import asyncio
+from learntwin.models.models_bkt import BKTModel
+from learntwin.recommender import Recommender
+from learntwin.serving.app import App
+from learntwin.serving.loadtest import _request, run
+def test_contract_and_micro_batching():
+    bkt = BKTModel(); bkt.update("u1", "sub", True)
+    cands = [{"item_id": "i2", "skill_id": "add"}, {"item_id": "i1", "skill_id": "add"}, {"item_id": "i3", "skill_id": "sub"}]
+    async def scenario():
+        app = App(bkt, window=0.01)
+        server = await app.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            async def call(path, payload):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                try:
+                    return await _request(reader, writer, "POST", path, payload, close=True)
+                finally:
+                    writer.close(); await writer.wait_closed()
+            got = await asyncio.gather(
+                call("/get_mastery", {"user_id": "u1", "skill_id": "sub"}),
+                call("/get_mastery", {"user_id": "u9", "skill_id": "add"}),
+                call("/next_items", {"user_id": "u1", "candidates": cands, "k": 2}),
+                call("/get_mastery", {"user_id": 5}),
+            )
+            report = await run("127.0.0.1", port, requests=200, concurrency=8)
+        return app, got, report
+    app, got, report = asyncio.run(scenario())
+    assert got[0] == (200, {"user_id": "u1", "skill_id": "sub", "mastery": bkt.get_mastery("u1", "sub")})
+    assert got[1][1]["mastery"] == 0.2 and got[3][0] == 400
+    assert got[2][1]["items"] == Recommender(bkt).next_items("u1", cands, k=2)
+    assert app.mastery_batcher.batches < app.mastery_batcher.items
+    assert report["errors"] == 0 and report["server"]["latency"]["get_mastery"]["count"] >= 3
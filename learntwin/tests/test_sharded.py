@@ -0,0 +1,81 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.models_bkt import BKTModel, BKTParams
+from learntwin.models.sharded import ShardedBKTModel
+from learntwin.recommender import Recommender
+def _log(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    users = np.char.add("u", rng.integers(0, 40, n).astype(str))
+    skills = np.char.add("s", rng.integers(0, 6, n).astype(str))
+    return users, skills, rng.integers(0, 2, n), rng.random(n)
+def test_sharded_matches_single_model():
+    users, skills, correct, ts = _log()
+    table = {"s1": BKTParams(p_init=0.5, p_learn=0.3)}
+    single = BKTModel(skill_params=table)
+    expected = single.update_batch(users, skills, correct, ts)
+    with ShardedBKTModel(3, seed=7, skill_params=table) as sh:
+        assert np.array_equal(sh.update_batch(users, skills, correct, ts), expected)
+        assert sh.update("u1", "s2", True) == single.update("u1", "s2", True)
+        assert sh.get_mastery("u1", "s2") == single.get_mastery("u1", "s2")
+        assert np.array_equal(sh.get_mastery_many(users, skills), single.get_mastery_many(users, skills))
+        ids, values = sh.skill_mastery("s1")
+        assert sorted(ids) == sorted(single.users)
+        assert dict(zip(ids, values)) == dict(zip(single.users, single.skill_mastery("s1")))
+        skill_ids, row = sh.user_mastery("u3")
+        assert dict(zip(skill_ids, row)) == {s: single.get_mastery("u3", s) for s in skill_ids}
+def test_partition_is_stable_and_seeded():
+    with ShardedBKTModel(4, seed=1) as a, ShardedBKTModel(4, seed=1) as b:
+        ids = [f"u{i}" for i in range(200)]
+        assert [a.shard_of(u) for u in ids] == [b.shard_of(u) for u in ids]
+        assert set(a.shard_of(u) for u in ids) == {0, 1, 2, 3}
+        assert a._shards_of(ids).tolist() == [a.shard_of(u) for u in ids]
+    with pytest.raises(ValueError):
+        ShardedBKTModel(0)
+def test_sharded_snapshot_roundtrip(tmp_path):
+    users, skills, correct, _ = _log(seed=2)
+    with ShardedBKTModel(2, seed=5) as sh:
+        sh.update_batch(users, skills, correct)
+        sh.save(tmp_path / "snap")
+        expected = sh.get_mastery_many(users, skills)
+    with ShardedBKTModel.load(tmp_path / "snap") as r:
+        assert r.n_shards == 2 and r.seed == 5 and np.array_equal(r.get_mastery_many(users, skills), expected)
+        with pytest.raises(ValueError):
+            r.update_batch(["u1"], ["s1"], [1, 0])
+        for ts in ([1.0, 2.0, 3.0], [1.0]):
+            with pytest.raises(ValueError, match="ts"):
+                r.update_batch(["a", "b"], ["s", "s"], [1, 1], ts=ts)
+        with pytest.raises(ValueError):
+            r.get_mastery_many(["a"], ["s", "t"])
+        assert np.array_equal(r.get_mastery_many(users, skills), expected)  # nothing was applied
+    with pytest.raises(ValueError, match="seed"):
+        ShardedBKTModel.load(tmp_path / "snap", seed=0)
+def test_sharded_time_aware_matches_single_model():
+    users, skills, correct, ts = _log(seed=3)
+    ts = ts * 10 * 86400.0
+    table = {"s1": BKTParams(half_life=86400.0), "s2": BKTParams(half_life=3600.0)}
+    single = BKTModel(skill_params=table, time_aware=True, clock=lambda: 5 * 86400.0)
+    expected = single.update_batch(users, skills, correct, ts)
+    with ShardedBKTModel(3, skill_params=table, time_aware=True, clock=lambda: 5 * 86400.0) as sh:
+        assert np.array_equal(sh.update_batch(users, skills, correct, ts), expected)
+        assert sh.update("u1", "s1", True) == single.update("u1", "s1", True)
+        later = 20 * 86400.0
+        assert np.array_equal(sh.get_mastery_many(users, skills, now=later), single.get_mastery_many(users, skills, now=later))
+        assert sh.get_mastery("u2", "s2") == single.get_mastery("u2", "s2")
+        ids, values = sh.skill_mastery("s1", now=later)
+        assert dict(zip(ids, values)) == dict(zip(single.users, single.skill_mastery("s1", now=later)))
+        cands = [{"item_id": f"i{j}", "skill_id": f"s{j % 6}"} for j in range(12)]
+        batch = Recommender(sh).next_items_batch(["u1", "u2", "u9"], cands, k=3, now=later)
+        assert batch == Recommender(single).next_items_batch(["u1", "u2", "u9"], cands, k=3, now=later)
+        assert batch[0] == Recommender(sh).next_items("u1", cands, k=3, now=later)
+def test_rejected_skill_params_leave_every_shard_unchanged():
+    single = BKTModel()
+    with ShardedBKTModel(2, seed=0) as sh:
+        users = [f"u{i}" for i in range(20)]
+        writer = next(u for u in users if sh.shard_of(u) == 0)
+        for m in (sh, single):
+            m.update(writer, "s1", True)
+            with pytest.raises(ValueError):
+                m.set_skill_params({"s1": BKTParams(p_init=0.9)})
+        assert {sh.shard_of(u) for u in users} == {0, 1}
+        assert np.array_equal(sh.get_mastery_many(users, ["s1"] * 20), single.get_mastery_many(users, ["s1"] * 20))
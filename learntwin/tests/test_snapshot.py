@@ -0,0 +1,45 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.models_bkt import BKTModel, BKTParams
+def _same(a, b):
+    assert list(a.users) == list(b.users) and list(a.skills) == list(b.skills)
+    assert np.array_equal(a.mastery_matrix(), b.mastery_matrix()) and a.skill_params == b.skill_params
+def test_snapshot_roundtrip_is_mmapped(tmp_path):
+    m = BKTModel(seed=3, skill_params={"sub": BKTParams(p_init=0.4)})
+    m.update_batch(["u1", "u2", "u1"], ["add", "sub", "sub"], [1, 0, 1])
+    m.save(tmp_path / "snap")
+    r = BKTModel.load(tmp_path / "snap")
+    _same(m, r)
+    assert isinstance(r._store._data, np.memmap) and r.seed == 3
+    assert r.get_mastery("u3", "sub") == 0.4 and "u2" in r.users and "u9" not in r.users
+    r.update("u1", "add", False)  # copy-on-write: the file is untouched
+    assert BKTModel.load(tmp_path / "snap").get_mastery("u1", "add") == m.get_mastery("u1", "add")
+def test_deltas_append_only_changes(tmp_path):
+    m = BKTModel()
+    for i in range(100):
+        m.update(f"u{i}", "add", i % 2)
+    m.save(tmp_path / "snap")
+    m.update("u5", "add", True)
+    d1 = m.save_delta(tmp_path / "snap")
+    m.update("new", "mul", False)
+    m.set_skill_params({"div": BKTParams(p_init=0.7)})
+    m.save_delta(tmp_path / "snap")
+    r = BKTModel.load(tmp_path / "snap")
+    _same(m, r)
+    assert r.get_mastery("u5", "div") == 0.7
+    with np.load(d1) as d:
+        assert list(d["rows"]) == [5] and d["values"].shape == (1, 1)
+    r.update("u1", "add", True); r.save_delta(tmp_path / "snap")
+    with pytest.raises(ValueError):
+        m.save_delta(tmp_path / "snap")  # chain has diverged
+    with pytest.raises(ValueError):
+        BKTModel().save_delta(tmp_path / "snap")
+def test_empty_model_snapshot(tmp_path):
+    BKTModel().save(tmp_path / "e")
+    assert BKTModel.load(tmp_path / "e").get_mastery("u", "s") == 0.2
+def test_delta_new_skill_within_capacity(tmp_path):
+    m = BKTModel(); m.update("u1", "a", True); m.save(tmp_path / "s")
+    m.set_skill_params({"b": BKTParams(p_init=0.6)}); m.update("u2", "c", True)
+    m.save_delta(tmp_path / "s")
+    _same(m, BKTModel.load(tmp_path / "s"))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from learntwin.models.models_bkt import BKTModel, BKTParams
+from learntwin.models.store import MasteryStore
+def test_store_grows_and_keeps_values():
+    st = MasteryStore(0.2, user_block=2, skill_block=1)
+    for i in range(50):
+        st.set(f"u{i}", f"s{i % 7}", i / 100)
+    assert st.shape == (50, 7)
+    assert st.get("u49", "s0") == 0.49 and st.get("u49", "s1") == 0.2
+    assert st.get("nobody", "s0") == 0.2 and "nobody" not in st.users
+def test_bulk_views_share_memory_and_are_readonly():
+    m = BKTModel(BKTParams(p_init=0.3))
+    m.update("u1", "s1", 1); m.update("u2", "s2", 0)
+    row = m.user_mastery("u1"); col = m.skill_mastery("s2")
+    assert np.shares_memory(row, m.mastery_matrix())
+    assert list(m.skills) == ["s1", "s2"] and row[0] == m.get_mastery("u1", "s1")
+    assert col[0] == 0.3 and col[1] == m.get_mastery("u2", "s2")
+    with pytest.raises(ValueError):
+        row[0] = 1.0
+    assert list(m.user_mastery("ghost")) == [0.3, 0.3]
+def test_scalar_cell_and_ts_accessors():
+    plain, stamped = MasteryStore(0.2), MasteryStore(0.2, track_ts=True)
+    for st in (plain, stamped):
+        st.set("u", "s", 0.7, ts=5.0)
+        u, s = st.index("u", "s")
+        assert st.get_cell(u, s) == 0.7
+        assert st.gather_ts(*np.ix_([u], [s])).shape == (1, 1)
+    assert np.isnan(plain.ts_at(0, 0)) and stamped.ts_at(0, 0) == 5.0
+def test_block_matches_lookup_for_arrays_and_lists():
+    st = MasteryStore(0.2)
+    st.set("u1", "s1", 0.9)
+    users, skills = np.array(["u1", "zz"]), np.array(["s1", "s9"])
+    values, u, s = st.block(users, skills)
+    assert (u.tolist(), s.tolist()) == tuple(x.tolist() for x in st.lookup_many(users, skills))
+    assert np.array_equal(values, st.block(users.tolist(), skills.tolist())[0])
+    assert values.tolist() == [[0.9, 0.2], [0.2, 0.2]]
@@ -1,2 +1,65 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+import numpy as np
+
+
+def _iso_to_epoch(value: Any) -> float:
+    if value is None:
+        return float("nan")
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return float(value)  # numbers in a mixed column, e.g. [1.0, None]
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip()
+        if not text:
+            return float("nan")
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"  # fromisoformat only accepts "Z" on 3.11+
+        dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def to_epoch_seconds(values: Iterable[Any]) -> np.ndarray:
+    """
+    Convert timestamps to float64 epoch seconds; missing values become NaN.
+
+    Accepts numbers (taken as epoch seconds already), ``datetime64`` arrays,
+    ``datetime`` objects or ISO 8601 strings such as ``2025-11-11T10:00:00Z``.
+    Naive values are read as UTC.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        return arr.astype(np.float64)
+    if arr.dtype.kind == "M":
+        out = arr.astype("datetime64[ns]").astype(np.int64) / 1e9
+        out[np.isnat(arr)] = np.nan
+        return out
+    return np.fromiter((_iso_to_epoch(v) for v in arr.ravel()), dtype=np.float64, count=arr.size)
+
+
+def top_columns(scores: np.ndarray, m: int, keep_ties: bool = False) -> np.ndarray:
+    """
+    Boolean mask of each row's ``m`` highest-scoring columns.
+
+    Ties at the cut-off go to the lower column index, so exactly ``m`` per
+    row are selected; with ``keep_ties`` every column tied with the m-th
+    score is kept as well. Uses a partition rather than a full sort.
+    """
+    n_rows, n_cols = scores.shape
+    m = max(0, min(int(m), n_cols))
+    if m == 0:
+        return np.zeros(scores.shape, dtype=bool)
+    neg = -scores
+    kth = np.partition(neg, m - 1, axis=1)[:, m - 1 : m]
+    above = neg < kth
+    tied = neg == kth
+    if keep_ties:
+        return above | tied
+    need = m - above.sum(axis=1, keepdims=True)
+    return above | (tied & (np.cumsum(tied, axis=1) <= need))
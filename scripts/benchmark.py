@@ -0,0 +1,326 @@
+"""
+LearnTwin benchmark suite.
+
+Generates synthetic users/skills/items/interactions at a chosen scale and
+measures:
+
+- BKT single-update and get_mastery throughput
+- batch ingestion throughput (BKTModel.update_batch)
+- recommender latency percentiles over candidate-pool sizes and k, and
+  next_items_batch throughput
+- peak memory per million (user, skill) pairs
+- import time and snapshot startup time
+- learntwin.instrument overhead on get_mastery, disabled and enabled
+
+Results are written as JSON. With ``--baseline`` they are compared against a
+stored run and the script exits non-zero on regressions beyond
+``--tolerance``:
+
+    python scripts/benchmark.py --scale small --output bench.json
+    python scripts/benchmark.py --scale small --baseline bench.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from learntwin import instrument  # noqa: E402
+from learntwin.models.models_bkt import BKTModel  # noqa: E402
+from learntwin.recommender import Recommender as CandidateRecommender  # noqa: E402
+from learntwin.recsys.recommender import Item, Recommender as CatalogRecommender  # noqa: E402
+
+
+@dataclass
+class Scale:
+    users: int
+    skills: int
+    items: int
+    interactions: int
+    pools: List[int]
+    ks: List[int]
+    repeats: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(2_000, 50, 5_000, 200_000, [100, 1_000, 5_000], [1, 10], 50),
+    "medium": Scale(100_000, 200, 50_000, 2_000_000, [100, 1_000, 10_000, 50_000], [1, 10, 100], 30),
+    "large": Scale(1_000_000, 300, 200_000, 20_000_000, [1_000, 10_000, 50_000], [1, 10, 100], 20),
+}
+
+
+@dataclass
+class Synthetic:
+    user_ids: np.ndarray
+    skill_ids: np.ndarray
+    item_ids: np.ndarray
+    item_skill: np.ndarray
+    inter_user: np.ndarray
+    inter_skill: np.ndarray
+    inter_correct: np.ndarray
+    inter_ts: np.ndarray
+
+
+def generate(scale: Scale, seed: int = 0) -> Synthetic:
+    """Synthetic catalog and interaction log with Zipf-skewed user activity."""
+    rng = np.random.default_rng(seed)
+    user_ids = np.char.add("u", np.arange(scale.users).astype(str))
+    skill_ids = np.char.add("s", np.arange(scale.skills).astype(str))
+    item_ids = np.char.add("i", np.arange(scale.items).astype(str))
+    item_skill = rng.integers(0, scale.skills, scale.items)
+    n = scale.interactions
+    active = np.minimum(rng.zipf(1.3, n) - 1, scale.users - 1)
+    inter_item = rng.integers(0, scale.items, n)
+    return Synthetic(
+        user_ids=user_ids,
+        skill_ids=skill_ids,
+        item_ids=item_ids,
+        item_skill=item_skill,
+        inter_user=user_ids[rng.permutation(scale.users)[active]],
+        inter_skill=skill_ids[item_skill[inter_item]],
+        inter_correct=(rng.random(n) < 0.65).astype(np.int8),
+        inter_ts=np.sort(rng.random(n)) * 86400 * 90,
+    )
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ms = np.asarray(samples) * 1000.0
+    return {"p50_ms": float(np.percentile(ms, 50)), "p90_ms": float(np.percentile(ms, 90)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def _timed(fn: Callable[[Any], Any], args: List[Any], warmup: int = 3) -> List[float]:
+    for a in args[:warmup]:
+        fn(a)
+    out = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(a)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_bkt(data: Synthetic, n_single: int = 200_000) -> Dict[str, float]:
+    n = min(n_single, len(data.inter_user))
+    users = data.inter_user[:n].tolist()
+    skills = data.inter_skill[:n].tolist()
+    correct = data.inter_correct[:n].tolist()
+    model = BKTModel()
+    t0 = time.perf_counter()
+    for u, s, c in zip(users, skills, correct):
+        model.update(u, s, c)
+    t1 = time.perf_counter()
+    for u, s in zip(users, skills):
+        model.get_mastery(u, s)
+    t2 = time.perf_counter()
+    return {"bkt.update.ops_per_s": n / (t1 - t0), "bkt.get_mastery.ops_per_s": n / (t2 - t1)}
+
+
+def bench_batch(data: Synthetic) -> Dict[str, float]:
+    model = BKTModel()
+    t0 = time.perf_counter()
+    model.update_batch(data.inter_user, data.inter_skill, data.inter_correct, data.inter_ts)
+    dt = time.perf_counter() - t0
+    return {"bkt.update_batch.rows_per_s": len(data.inter_user) / dt}
+
+
+def bench_recommenders(data: Synthetic, scale: Scale, seed: int = 0, batch_users: int = 1000) -> Dict[str, float]:
+    rng = np.random.default_rng(seed + 1)
+    batch = data.user_ids[np.random.default_rng(seed + 2).integers(0, scale.users, batch_users)].tolist()
+    model = BKTModel()
+    model.update_batch(data.inter_user, data.inter_skill, data.inter_correct, data.inter_ts)
+    users = data.user_ids[rng.integers(0, scale.users, scale.repeats)].tolist()
+    out: Dict[str, float] = {}
+    cand_rec = CandidateRecommender(model)
+    for pool in scale.pools:
+        idx = rng.integers(0, scale.items, pool)
+        cands = [{"item_id": i, "skill_id": s} for i, s in zip(data.item_ids[idx].tolist(), data.skill_ids[data.item_skill[idx]].tolist())]
+        catalog = CatalogRecommender(model, {c["item_id"]: Item(c["item_id"], c["skill_id"]) for c in cands})
+        for k in scale.ks:
+            runs = {
+                "candidates": lambda u: cand_rec.next_items(u, cands, k=k),
+                "catalog": lambda u: catalog.next_items(u, k=k),
+            }
+            for name, fn in runs.items():
+                for key, v in _percentiles(_timed(fn, users)).items():
+                    out[f"recommender.{name}.pool{pool}.k{k}.{key}"] = v
+            batches = {
+                "candidates": lambda us: cand_rec.next_items_batch(us, cands, k=k),
+                "catalog": lambda us: catalog.next_items_batch(us, k=k),
+            }
+            for name, fn in batches.items():
+                dt = min(_timed(fn, [batch] * 3, warmup=1))
+                out[f"recommender.{name}.batch.pool{pool}.k{k}.users_per_s"] = len(batch) / dt
+    return out
+
+
+def bench_memory(scale: Scale, max_pairs: int = 2_000_000) -> Dict[str, float]:
+    """Peak traced allocation while ingesting one event for every (user, skill) pair."""
+    users = max(1, min(scale.users, max_pairs // scale.skills))
+    pairs = users * scale.skills
+    u = np.repeat(np.char.add("u", np.arange(users).astype(str)), scale.skills)
+    s = np.tile(np.char.add("s", np.arange(scale.skills).astype(str)), users)
+    correct = np.ones(pairs, dtype=np.int8)
+    tracemalloc.start()
+    model = BKTModel()
+    model.update_batch(u, s, correct)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "memory.peak_bytes_per_million_pairs": peak / (pairs / 1e6),
+        "memory.store_bytes_per_million_pairs": model._store.nbytes / (pairs / 1e6),
+    }
+
+
+def bench_startup(data: Synthetic, repeats: int = 5) -> Dict[str, float]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    imports = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import learntwin"], check=True, env=env)
+        imports.append(time.perf_counter() - t0)
+    model = BKTModel()
+    model.update_batch(data.inter_user, data.inter_skill, data.inter_correct, data.inter_ts)
+    with tempfile.TemporaryDirectory() as tmp:
+        model.save(Path(tmp) / "snap")
+        probe = data.inter_user[0], data.inter_skill[0]
+        loads = _timed(lambda _: BKTModel.load(Path(tmp) / "snap").get_mastery(*probe), [None] * repeats)
+    return {
+        "startup.import_learntwin_ms": float(np.median(imports)) * 1000.0,
+        "startup.snapshot_load_and_read_ms": float(np.median(loads)) * 1000.0,
+    }
+
+
+def bench_instrumentation(data: Synthetic, n: int = 100_000, rounds: int = 5) -> Dict[str, float]:
+    """
+    get_mastery time with instrumentation never enabled, after an
+    enable/disable cycle, and while enabled, as ratios to the first.
+    Best of ``rounds`` interleaved runs, to keep scheduler noise out.
+    """
+    n = min(n, len(data.inter_user))
+    pairs = list(zip(data.inter_user[:n].tolist(), data.inter_skill[:n].tolist()))
+    model = BKTModel()
+    model.update_batch(data.inter_user, data.inter_skill, data.inter_correct, data.inter_ts)
+
+    def read() -> float:
+        get = model.get_mastery
+        t0 = time.perf_counter()
+        for u, s in pairs:
+            get(u, s)
+        return time.perf_counter() - t0
+
+    was_enabled, previous = instrument.enabled(), instrument.METRICS
+    instrument.disable()
+    best = {"baseline": float("inf"), "disabled": float("inf"), "enabled": float("inf")}
+    for _ in range(rounds):
+        best["baseline"] = min(best["baseline"], read())
+        with instrument.instrumented(instrument.Metrics()):
+            best["enabled"] = min(best["enabled"], read())
+        best["disabled"] = min(best["disabled"], read())
+    if was_enabled:
+        instrument.enable(previous)
+    return {
+        "instrument.disabled_time_ratio": best["disabled"] / best["baseline"],
+        "instrument.enabled_time_ratio": best["enabled"] / best["baseline"],
+        "instrument.enabled.get_mastery.ops_per_s": n / best["enabled"],
+    }
+
+
+def run(scale_name: str, seed: int = 0) -> Dict[str, Any]:
+    scale = SCALES[scale_name]
+    t0 = time.perf_counter()
+    data = generate(scale, seed)
+    metrics: Dict[str, float] = {}
+    metrics.update(bench_bkt(data))
+    metrics.update(bench_batch(data))
+    metrics.update(bench_recommenders(data, scale, seed))
+    metrics.update(bench_memory(scale))
+    metrics.update(bench_startup(data))
+    metrics.update(bench_instrumentation(data))
+    return {
+        "meta": {
+            "scale": scale_name,
+            "params": asdict(scale),
+            "seed": seed,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "total_seconds": time.perf_counter() - t0,
+        },
+        "metrics": metrics,
+    }
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith("_per_s")
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    tails: bool = False,
+    min_delta_ms: float = 0.1,
+) -> List[str]:
+    """
+    Return a line per metric that regressed by more than ``tolerance`` (a fraction).
+
+    p90/p99 latencies are only compared with ``tails=True``; at sub-millisecond
+    scale they mostly measure scheduler noise, as do latency changes smaller
+    than ``min_delta_ms``.
+    """
+    regressions = []
+    for name, base in baseline["metrics"].items():
+        cur = current["metrics"].get(name)
+        if cur is None or not base:
+            continue
+        if not tails and name.endswith(("p90_ms", "p99_ms")):
+            continue
+        if name.endswith("_ms") and cur - base < min_delta_ms:
+            continue
+        change = (base - cur) / base if higher_is_better(name) else (cur - base) / base
+        if change > tolerance:
+            regressions.append(f"{name}: {base:.4g} -> {cur:.4g} ({change:+.1%} worse)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="LearnTwin benchmark suite")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--output", help="write results JSON here (default: stdout)")
+    ap.add_argument("--baseline", help="compare against a previous results JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, as a fraction")
+    ap.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore smaller latency changes")
+    ap.add_argument("--tails", action="store_true", help="also compare p90/p99 latencies")
+    args = ap.parse_args()
+
+    result = run(args.scale, args.seed)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance, args.tails, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
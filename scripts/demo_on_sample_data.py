@@ -1,7 +1,12 @@
 ﻿import csv
+import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from learntwin.analytics import CohortAnalytics  # noqa: E402
+
 DATA_DIR = ROOT / 'sample_data'
 DEFAULT_NAME = 'demo_class.csv'
 
@@ -32,30 +37,20 @@ def find_data_file() -> Path:
 
 
 def load_rows(path: Path):
-    with path.open(newline='', encoding='utf-8') as f:
+    with path.open(newline='', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
         return list(reader)
 
 
-def _to_float(row, key, default=0.0):
-    try:
-        return float(row.get(key, default) or default)
-    except ValueError:
-        return default
-
-
 def rich_demo(data_path: Path, rows):
-    total = len(rows)
-    avg_score = sum(_to_float(r, 'avg_score') for r in rows) / total
-    avg_att = sum(_to_float(r, 'attendance_rate') for r in rows) / total
-
-    at_risk = []
-    for r in rows:
-        score = _to_float(r, 'avg_score')
-        att = _to_float(r, 'attendance_rate')
-        last = _to_float(r, 'last_activity_days_ago')
-        if score < 60 or att < 0.8 or last > 14:
-            at_risk.append(r)
+    # Column-wise, vectorised evaluation of the default at-risk rules
+    # (score < 60, attendance < 0.8, inactive > 14 days).
+    ca = CohortAnalytics.from_csv(data_path)
+    totals = ca.totals()
+    total = totals['students']
+    avg_score = totals['mean_avg_score']
+    avg_att = totals['mean_attendance_rate']
+    at_risk = ca.at_risk()
 
     print('LearnTwin demo on sample data')
     print('-' * 50)
@@ -65,9 +60,7 @@ def rich_demo(data_path: Path, rows):
     print(f'Average attendance  : {avg_att*100:.1f}%')
     print()
     print(f'Students flagged as at-risk (simple rule): {len(at_risk)}')
-    for r in at_risk:
-        sid = r.get('student_id', '?')
-        name = r.get('student_name', '?')
+    for sid, name in at_risk:
         print(f'  - {sid} | {name}')
 
 
@@ -79,7 +72,7 @@ def generic_demo(data_path: Path, rows):
     if not rows:
         return
     cols = sorted(rows[0].keys())
-    print(f'Columns          : {', '.join(cols)}')
+    print(f'Columns          : {", ".join(cols)}')
     print()
     print('First rows:')
     for i, r in enumerate(rows[:5], start=1):
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from learntwin import io
+from learntwin.fit import fit_skills, format_report, write_fits
+
+def main():
+    ap = argparse.ArgumentParser(description="Fit per-skill BKT parameters from interactions.csv")
+    ap.add_argument("interactions")
+    ap.add_argument("-o", "--output", default="skill_params.csv")
+    ap.add_argument("-j", "--processes", type=int, default=None)
+    ap.add_argument("--cache-dir", default=None)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    chunks = list(io.read_interactions(args.interactions, cache_dir=args.cache_dir))
+    cols = {c: np.concatenate([ch[c] for ch in chunks]) for c in ("user_id", "skill_id", "correct", "ts")}
+    t1 = time.perf_counter()
+    fits = fit_skills(cols["user_id"], cols["skill_id"], cols["correct"], cols["ts"], processes=args.processes)
+    t2 = time.perf_counter()
+    write_fits(args.output, fits)
+
+    print(f"load: {(t1-t0)*1000:.1f} ms")
+    print(format_report(fits, wall_seconds=t2 - t1))
+    print(f"wrote {args.output}")
+
+if __name__ == "__main__":
+    main()